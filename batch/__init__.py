@@ -0,0 +1 @@
+from .runner import load_results, run_cohort
@@ -0,0 +1,3 @@
+from batch.runner import main
+
+main()
@@ -0,0 +1,263 @@
+import argparse
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from model import Analyser, DataProcessor, EpisodeTable, Hypnogram
+from model.Filtering import FILTERS
+
+# Каналы для признаков и целевая переменная, как в srv.jobs
+FEATURE_COLUMNS = ["Airflow", "Chest", "Abdomen"]
+TARGET_COLUMN = "SaO2"
+
+# Столбцы таблицы эпизодов в итоговом файле
+EPISODE_COLUMNS = ["patient", "record", "start", "end", "start_time", "end_time", "kind"]
+# Столбцы сводки по записям в итоговом файле
+RECORD_COLUMNS = [
+    "patient",
+    "record",
+    "duration",
+    "n_apnoe",
+    "n_hypapnoe",
+    "ahi",
+    "total_sleep_time",
+    "sleep_onset",
+    "sleep_offset",
+    "third_1",
+    "third_2",
+    "third_3",
+    "load",
+    "filtering",
+    "features",
+    "detection",
+    "seconds",
+]
+
+
+def analyse_record(dir_path, patient_id, record_id, detect_kwargs=None, filters=None):
+    """
+    Загрузка, построение признаков и разметка эпизодов одной записи
+    (выполняется в отдельном процессе).
+
+    :param dir_path: Корневая директория исследований.
+    :param patient_id: Номер пациента.
+    :param record_id: Номер исследования.
+    :param detect_kwargs: Параметры mark_episodes (big_window, small_window, num_parts).
+    :param filters: Фильтры каналов (как model.Filtering.FILTERS) или None.
+    :return: Словарь столбцов эпизодов и словарь сводки по записи.
+    """
+    start = time.perf_counter()
+    analyser = Analyser(dir_path, None)
+    table = analyser.automark(patient_id, record_id, filters=filters, **(detect_kwargs or {}))
+    analyser.prep_X_y(FEATURE_COLUMNS, TARGET_COLUMN)
+    summary = Hypnogram.from_samples(analyser.hypno["stage"], analyser.hypno.sfreq).summary(table)
+
+    n = len(table)
+    episodes = {
+        "patient": np.full(n, patient_id, dtype=np.int64),
+        "record": np.full(n, record_id, dtype=np.int64),
+        "start": table.start,
+        "end": table.end,
+        "start_time": table.start_time,
+        "end_time": table.end_time,
+        "kind": np.asarray(EpisodeTable.kinds)[table.kind],
+    }
+    timings = analyser.timings.totals()
+    record = {
+        "patient": patient_id,
+        "record": record_id,
+        "duration": analyser.poly.duration,
+        "n_apnoe": int(np.count_nonzero(table.kind == 0)),
+        "n_hypapnoe": int(np.count_nonzero(table.kind == 1)),
+        "ahi": summary["ahi"],
+        "total_sleep_time": summary["total_sleep_time"],
+        "sleep_onset": np.nan if summary["sleep_onset"] is None else summary["sleep_onset"],
+        "sleep_offset": np.nan if summary["sleep_offset"] is None else summary["sleep_offset"],
+        "third_1": summary["thirds"][0],
+        "third_2": summary["thirds"][1],
+        "third_3": summary["thirds"][2],
+        "load": timings.get("load", 0.0),
+        "filtering": timings.get("filtering", 0.0),
+        "features": timings.get("features", 0.0),
+        "detection": timings.get("detection", 0.0),
+        "seconds": time.perf_counter() - start,
+    }
+    return episodes, record
+
+
+def _checkpoint_path(checkpoint_dir, patient_id, record_id):
+    return os.path.join(checkpoint_dir, f"Np{patient_id}_Nr{record_id}.npz")
+
+
+def _write_columns(path, columns):
+    """
+    Атомарно сохраняет столбцы в .npz: файл сначала пишется под временным
+    именем и затем переименовывается, так что прерванный процесс не
+    оставляет неполных файлов.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez_compressed(f, **columns)
+    os.replace(tmp_path, path)
+
+
+def _save_checkpoint(checkpoint_dir, episodes, record):
+    columns = {f"episodes.{name}": values for name, values in episodes.items()}
+    columns.update({f"records.{name}": np.asarray([value]) for name, value in record.items()})
+    _write_columns(_checkpoint_path(checkpoint_dir, record["patient"], record["record"]), columns)
+
+
+def _load_columns(path):
+    with np.load(path, allow_pickle=False) as data:
+        return {name: data[name] for name in data.files}
+
+
+def load_results(path):
+    """
+    Читает итоговый файл run_cohort.
+
+    :param path: Путь к файлу .npz.
+    :return: DataFrame эпизодов и DataFrame сводки по записям.
+    """
+    columns = _load_columns(path)
+    episodes = pd.DataFrame({name: columns[f"episodes.{name}"] for name in EPISODE_COLUMNS})
+    records = pd.DataFrame({name: columns[f"records.{name}"] for name in RECORD_COLUMNS})
+    return episodes, records
+
+
+def run_cohort(
+    dir_path,
+    output,
+    n_workers=None,
+    resume=True,
+    keep_checkpoints=False,
+    detect_kwargs=None,
+    filters=None,
+    log=print,
+):
+    """
+    Пакетная обработка всех исследований "Np */Nr *" в директории.
+
+    Записи обрабатываются в пуле процессов. Результат каждой завершённой
+    записи сразу сохраняется в директорию контрольных точек <output>.parts,
+    поэтому прерванный запуск при повторе продолжает с необработанных
+    записей. В конце контрольные точки собираются в один столбцовый файл
+    .npz с таблицей эпизодов (episodes.*) и сводкой по записям (records.*).
+
+    :param dir_path: Корневая директория исследований.
+    :param output: Путь к итоговому файлу .npz.
+    :param n_workers: Количество процессов (None - по числу ядер).
+    :param resume: Пропускать записи с сохранёнными контрольными точками.
+    :param keep_checkpoints: Не удалять контрольные точки после сборки файла.
+    :param detect_kwargs: Параметры mark_episodes (big_window, small_window, num_parts).
+    :param filters: Фильтры каналов перед разметкой (None - без фильтрации).
+    :param log: Функция вывода сообщений о ходе обработки.
+    :return: Словарь со статистикой запуска.
+    """
+    checkpoint_dir = f"{output}.parts"
+    os.makedirs(checkpoint_dir, exist_ok=True)
+
+    record_dirs = DataProcessor(dir_path).find_record_dirs()
+    pending = [
+        (patient_id, record_id)
+        for patient_id, record_id in record_dirs
+        if not (resume and os.path.exists(_checkpoint_path(checkpoint_dir, patient_id, record_id)))
+    ]
+    log(f"Записей: {len(record_dirs)}, уже обработано: {len(record_dirs) - len(pending)}")
+
+    failed = {}
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        futures = {
+            executor.submit(analyse_record, dir_path, patient_id, record_id, detect_kwargs, filters): (
+                patient_id,
+                record_id,
+            )
+            for patient_id, record_id in pending
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            patient_id, record_id = futures[future]
+            try:
+                episodes, record = future.result()
+            except Exception:
+                failed[(patient_id, record_id)] = traceback.format_exc()
+                log(f"[{done}/{len(pending)}] Np {patient_id}/Nr {record_id}: ошибка")
+                continue
+            _save_checkpoint(checkpoint_dir, episodes, record)
+            log(f"[{done}/{len(pending)}] Np {patient_id}/Nr {record_id}: {record['seconds']:.1f} с")
+    elapsed = time.perf_counter() - start
+
+    parts = [
+        _load_columns(_checkpoint_path(checkpoint_dir, patient_id, record_id))
+        for patient_id, record_id in record_dirs
+        if (patient_id, record_id) not in failed
+        and os.path.exists(_checkpoint_path(checkpoint_dir, patient_id, record_id))
+    ]
+    columns = {
+        f"{table}.{name}": np.concatenate([part[f"{table}.{name}"] for part in parts])
+        if parts
+        else np.empty(0)
+        for table, names in (("episodes", EPISODE_COLUMNS), ("records", RECORD_COLUMNS))
+        for name in names
+    }
+    _write_columns(output, columns)
+    if not keep_checkpoints and not failed:
+        for name in os.listdir(checkpoint_dir):
+            os.remove(os.path.join(checkpoint_dir, name))
+        os.rmdir(checkpoint_dir)
+
+    processed = len(pending) - len(failed)
+    stats = {
+        "records": len(record_dirs),
+        "processed": processed,
+        "skipped": len(record_dirs) - len(pending),
+        "failed": failed,
+        "seconds": elapsed,
+        "records_per_hour": processed / elapsed * 3600 if elapsed else 0.0,
+    }
+    log(
+        f"Обработано {processed} записей за {elapsed:.1f} с "
+        f"({stats['records_per_hour']:.1f} записей/ч), пропущено {stats['skipped']}, "
+        f"ошибок {len(failed)}"
+    )
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Пакетная обработка исследований ПСГ")
+    parser.add_argument("dir", help="корневая директория с исследованиями Np */Nr *")
+    parser.add_argument("--output", default="cohort.npz", help="итоговый файл .npz")
+    parser.add_argument("--workers", type=int, default=None, help="количество процессов")
+    parser.add_argument("--no-resume", action="store_true", help="обработать все записи заново")
+    parser.add_argument("--keep-checkpoints", action="store_true",
+                        help="не удалять контрольные точки после сборки файла")
+    parser.add_argument("--big-window", type=int, default=60, help="большое окно, секунды")
+    parser.add_argument("--small-window", type=int, default=4, help="маленькое окно, секунды")
+    parser.add_argument("--num-parts", type=int, default=8, help="количество кусочков большого окна")
+    parser.add_argument("--filter", action="store_true",
+                        help="фильтровать каналы перед разметкой (model.Filtering.FILTERS)")
+    args = parser.parse_args(argv)
+
+    stats = run_cohort(
+        args.dir,
+        args.output,
+        n_workers=args.workers,
+        resume=not args.no_resume,
+        keep_checkpoints=args.keep_checkpoints,
+        detect_kwargs={
+            "big_window": args.big_window,
+            "small_window": args.small_window,
+            "num_parts": args.num_parts,
+        },
+        filters=FILTERS if args.filter else None,
+    )
+    for (patient_id, record_id), error in stats["failed"].items():
+        print(f"Np {patient_id}/Nr {record_id}:\n{error}")
+
+
+if __name__ == "__main__":
+    main()
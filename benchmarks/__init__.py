@@ -0,0 +1,2 @@
+from .synthetic import generate_record
+from .bench import run_benchmark
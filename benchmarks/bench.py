@@ -0,0 +1,150 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from model import Analyser, DataProcessor
+from front.dash_import import data_preprocessing
+from front.report import render_report
+from benchmarks.synthetic import DEFAULT_CHANNELS, generate_record
+
+# Каналы для признаков и целевая переменная, как в srv.jobs
+FEATURE_COLUMNS = ["Airflow", "Chest", "Abdomen"]
+TARGET_COLUMN = "SaO2"
+
+STAGES = ["load", "get_record", "prep_X_y", "mark_episodes", "data_preprocessing", "report"]
+
+
+def measure(func, *args, **kwargs):
+    """
+    Время выполнения и пиковый объём памяти, выделенной во время вызова.
+
+    :param func: Вызываемая функция.
+    :return: Результат, время в секундах и пик памяти в байтах.
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = func(*args, **kwargs)
+    finally:
+        seconds = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return result, seconds, peak
+
+
+def bench_record(dir_path, duration, sfreq, channels, stages=STAGES, seed=0):
+    """
+    Замеры этапов обработки одной синтетической записи.
+
+    :param dir_path: Директория для синтетических исследований.
+    :param duration: Длительность записи, секунды.
+    :param sfreq: Частота дискретизации.
+    :param channels: Каналы полиграммы.
+    :param stages: Замеряемые этапы.
+    :param seed: Начальное значение генератора.
+    :return: Список словарей с результатами по этапам.
+    """
+    record = generate_record(dir_path, duration=duration, sfreq=sfreq, channels=channels, seed=seed)
+    n_samples = int(duration * sfreq)
+    analyser = Analyser(dir_path, None)
+    # Гипнограмма по отсчётам полиграммы для поиска границ сна
+    hyp = np.repeat(record["stages"], int(30 * sfreq))[:n_samples]
+
+    steps = {
+        "load": lambda: DataProcessor(dir_path).fix_load_specific(1, 1),
+        "get_record": lambda: analyser.get_record(1, 1),
+        "prep_X_y": lambda: analyser.prep_X_y(FEATURE_COLUMNS, TARGET_COLUMN),
+        "mark_episodes": lambda: analyser.mark_episodes(analyser.df_poly, hyp),
+        "data_preprocessing": lambda: _data_preprocessing(analyser, sfreq),
+        "report": lambda: _report(analyser, outputs["mark_episodes"], duration),
+    }
+
+    # Разметка этапа mark_episodes, по которой строится отчёт
+    outputs = {}
+    results = []
+    for stage in stages:
+        if stage == "report" and "mark_episodes" not in outputs:
+            # Разметка без замера, чтобы она не входила во время отчёта
+            outputs["mark_episodes"] = steps["mark_episodes"]()
+        result, seconds, peak = measure(steps[stage])
+        if stage == "mark_episodes":
+            outputs[stage] = result
+        results.append({
+            "duration": duration,
+            "stage": stage,
+            "seconds": seconds,
+            "samples_per_second": n_samples * len(channels) / seconds if seconds else float("inf"),
+            "realtime": duration / seconds if seconds else float("inf"),
+            "peak_mb": peak / 2 ** 20,
+        })
+    return results
+
+
+def _data_preprocessing(analyser, sfreq):
+    hypno = analyser.df_hypno.iloc[::30].reset_index(drop=True)
+    return data_preprocessing(analyser.df_poly, hypno, int(sfreq))
+
+
+def _report(analyser, episodes, duration):
+    episodes = analyser.episodes_df(episodes)
+    return render_report(episodes, int(duration), 0)
+
+
+def run_benchmark(durations, sfreq=200, channels=DEFAULT_CHANNELS, stages=STAGES, repeat=1, dir_path=None):
+    """
+    Замеры этапов обработки на синтетических записях разной длительности.
+
+    :param durations: Длительности записей, секунды.
+    :param sfreq: Частота дискретизации.
+    :param channels: Каналы полиграммы.
+    :param stages: Замеряемые этапы.
+    :param repeat: Количество повторов; в результат идёт лучшее время.
+    :param dir_path: Директория для синтетических файлов (None - временная).
+    :return: Список словарей с результатами.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        results = []
+        for duration in durations:
+            record_dir = os.path.join(dir_path or tmp, f"{int(duration)}s")
+            runs = [bench_record(record_dir, duration, sfreq, channels, stages) for _ in range(repeat)]
+            for stage_runs in zip(*runs):
+                results.append(min(stage_runs, key=lambda row: row["seconds"]))
+        return results
+
+
+def format_table(results):
+    header = f"{'duration, s':>12} {'stage':<20} {'time, s':>9} {'samples/s':>12} {'x realtime':>11} {'peak, MB':>9}"
+    lines = [header, "-" * len(header)]
+    for row in results:
+        lines.append(
+            f"{row['duration']:>12.0f} {row['stage']:<20} {row['seconds']:>9.3f} "
+            f"{row['samples_per_second']:>12.3g} {row['realtime']:>11.1f} {row['peak_mb']:>9.1f}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры производительности на синтетических записях ПСГ")
+    parser.add_argument("--durations", type=float, nargs="+", default=[600, 3600, 8 * 3600],
+                        help="длительности записей, секунды")
+    parser.add_argument("--sfreq", type=float, default=200, help="частота дискретизации")
+    parser.add_argument("--stages", nargs="+", default=STAGES, choices=STAGES, help="замеряемые этапы")
+    parser.add_argument("--repeat", type=int, default=1, help="количество повторов")
+    parser.add_argument("--dir", default=None, help="директория для синтетических файлов")
+    parser.add_argument("--json", default=None, help="сохранить результаты в JSON")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args.durations, args.sfreq, stages=args.stages, repeat=args.repeat, dir_path=args.dir)
+    print(format_table(results))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
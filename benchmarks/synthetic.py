@@ -0,0 +1,155 @@
+import os
+
+import mne
+import numpy as np
+
+# Каналы синтетической полиграммы: дыхательные, сатурация и ЭЭГ
+RESPIRATORY_CHANNELS = ["Airflow", "Chest", "Abdomen"]
+EEG_CHANNELS = ["Fp1-M2", "C3-M2", "O1-M2", "Fp2-M1", "C4-M1", "O2-M1"]
+DEFAULT_CHANNELS = RESPIRATORY_CHANNELS + ["SaO2"] + EEG_CHANNELS
+
+# Множитель амплитуды дыхания во время эпизода
+EVENT_SCALE = {"apnoe": 0.03, "hypapnoe": 0.35}
+# Падение сатурации во время эпизода, %
+EVENT_DESATURATION = {"apnoe": 6.0, "hypapnoe": 5.0}
+
+
+def make_events(duration, n_events, rng, min_length=12.0, max_length=40.0):
+    """
+    Случайные непересекающиеся эпизоды апноэ и гипопноэ.
+
+    :param duration: Длительность записи, секунды.
+    :param n_events: Количество эпизодов.
+    :param rng: np.random.Generator.
+    :param min_length: Минимальная длительность эпизода, секунды.
+    :param max_length: Максимальная длительность эпизода, секунды.
+    :return: Список кортежей (тип, начало, конец) в секундах, по возрастанию начала.
+    """
+    # Эпизоды размещаются по одному в равных интервалах, чтобы не пересекаться
+    slot = duration / max(n_events, 1)
+    events = []
+    for k in range(n_events):
+        length = min(rng.uniform(min_length, max_length), slot / 2)
+        start = k * slot + rng.uniform(0, slot - length)
+        kind = "apnoe" if rng.random() < 0.5 else "hypapnoe"
+        events.append((kind, start, start + length))
+    return events
+
+
+def make_hypnogram(duration, rng, epoch=30.0, wake_epochs=10):
+    """
+    Гипнограмма по эпохам: бодрствование в начале и в конце, между ними стадии 1-4.
+
+    :param duration: Длительность записи, секунды.
+    :param rng: np.random.Generator.
+    :param epoch: Длительность эпохи, секунды.
+    :param wake_epochs: Количество эпох бодрствования в начале и в конце.
+    :return: Массив стадий по эпохам.
+    """
+    n_epochs = int(np.ceil(duration / epoch))
+    wake = min(wake_epochs, n_epochs // 4)
+    stages = rng.integers(1, 5, n_epochs)
+    stages[:wake] = 0
+    stages[n_epochs - wake:] = 0
+    return stages
+
+
+def make_signals(duration, sfreq, channels, events, rng):
+    """
+    Синтетические сигналы полиграммы.
+
+    Дыхательные каналы - дыхание с частотой около 0.25 Гц, амплитуда которого
+    уменьшается во время эпизодов; SaO2 - около 96 % с падением после эпизода;
+    ЭЭГ - шум с альфа-ритмом.
+
+    :param duration: Длительность записи, секунды.
+    :param sfreq: Частота дискретизации.
+    :param channels: Имена каналов.
+    :param events: Эпизоды из make_events.
+    :param rng: np.random.Generator.
+    :return: Массив (каналы x отсчёты).
+    """
+    n = int(duration * sfreq)
+    t = np.arange(n) / sfreq
+
+    envelope = np.ones(n)
+    desaturation = np.zeros(n)
+    for kind, start, end in events:
+        i0, i1 = int(start * sfreq), int(end * sfreq)
+        envelope[i0:i1] = EVENT_SCALE[kind]
+        # Сатурация падает с задержкой и восстанавливается за 15 секунд
+        lag = int(10 * sfreq)
+        j0, j1 = min(i0 + lag, n), min(i1 + lag, n)
+        desaturation[j0:j1] = EVENT_DESATURATION[kind]
+        recovery = np.linspace(EVENT_DESATURATION[kind], 0, int(15 * sfreq))
+        desaturation[j1:j1 + len(recovery)] = recovery[: max(n - j1, 0)]
+
+    breath_rate = 0.25 + 0.02 * np.sin(2 * np.pi * t / 600)
+    breath = np.sin(2 * np.pi * np.cumsum(breath_rate) / sfreq)
+
+    data = np.empty((len(channels), n))
+    for i, channel in enumerate(channels):
+        if channel in RESPIRATORY_CHANNELS:
+            phase = 0.3 * RESPIRATORY_CHANNELS.index(channel)
+            signal = np.roll(breath, int(phase * sfreq))
+            data[i] = 1e-3 * (envelope * signal + 0.02 * rng.standard_normal(n))
+        elif channel == "SaO2":
+            data[i] = 96.0 - desaturation + 0.3 * rng.standard_normal(n)
+        else:
+            alpha = np.sin(2 * np.pi * rng.uniform(8, 12) * t + rng.uniform(0, 2 * np.pi))
+            noise = np.cumsum(rng.standard_normal(n))
+            noise -= np.convolve(noise, np.ones(int(sfreq)) / sfreq, mode="same")
+            data[i] = 2e-5 * (alpha + 0.3 * noise / np.sqrt(sfreq))
+    return data
+
+
+def generate_record(
+    dir_path,
+    patient_id=1,
+    record_id=1,
+    duration=3600.0,
+    sfreq=200,
+    channels=DEFAULT_CHANNELS,
+    events_per_hour=20,
+    seed=0,
+):
+    """
+    Создаёт синтетическое исследование в структуре "Np */Nr *" с файлами
+    полиграммы и гипнограммы в формате EDF. Одинаковые параметры дают
+    одинаковые файлы.
+
+    :param dir_path: Корневая директория исследований.
+    :param patient_id: Номер пациента.
+    :param record_id: Номер исследования.
+    :param duration: Длительность записи, секунды.
+    :param sfreq: Частота дискретизации полиграммы.
+    :param channels: Каналы полиграммы.
+    :param events_per_hour: Количество эпизодов апноэ и гипопноэ в час.
+    :param seed: Начальное значение генератора случайных чисел.
+    :return: Словарь с путями к файлам, гипнограммой и внесёнными эпизодами.
+    """
+    rng = np.random.default_rng(seed)
+    events = make_events(duration, int(round(events_per_hour * duration / 3600)), rng)
+    stages = make_hypnogram(duration, rng)
+    data = make_signals(duration, sfreq, channels, events, rng)
+
+    record_path = os.path.join(dir_path, f"Np {patient_id}", f"Nr {record_id}")
+    os.makedirs(record_path, exist_ok=True)
+
+    ch_types = ["misc" if channel == "SaO2" else "eeg" for channel in channels]
+    poly = mne.io.RawArray(data, mne.create_info(channels, sfreq, ch_types), verbose=0)
+    poly_path = os.path.join(record_path, f"{patient_id}_{record_id}_poly.EDF")
+    mne.export.export_raw(poly_path, poly, fmt="edf", overwrite=True, verbose=0)
+
+    # Гипнограмма хранится по секундам, стадия повторяется внутри эпохи
+    hypno_data = np.repeat(stages, 30)[: int(duration)].astype(float)[np.newaxis]
+    hypno = mne.io.RawArray(hypno_data, mne.create_info(["stage"], 1, "misc"), verbose=0)
+    hypno_path = os.path.join(record_path, f"{patient_id}_{record_id}_hypno.EDF")
+    mne.export.export_raw(hypno_path, hypno, fmt="edf", overwrite=True, verbose=0)
+
+    return {
+        "poly": poly_path,
+        "hypno": hypno_path,
+        "stages": stages,
+        "events": events,
+    }
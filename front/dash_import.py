@@ -1,187 +1,17 @@
 import pandas as pd
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-import random
 import plotly.graph_objects as go
-from docx.shared import Inches
-import os
-from datetime import datetime
-from docx import Document
-from docx.oxml import OxmlElement
-from docx.oxml.ns import qn
-from docx2pdf import convert
+from front.viewer import upper_viewer, lower_viewer
+from model.Episodes import EpisodeIndex, EpisodeTable
+from model.Recording import Recording
+from model.SignalPyramid import SignalPyramid
+from model.Timings import Timings
+from front.report import render_report, download_href
 from dash import Dash, dcc, html, callback, Input, Output, clientside_callback
 
-def set_cell_border(cell, **kwargs):
-    """
-    Set cell's border
-    Usage:
-    set_cell_border(
-        cell,
-        top={"sz": 12, "val": "single", "color": "000000", "space": "0"},
-        bottom={"sz": 12, "val": "single", "color": "000000", "space": "0"},
-        left={"sz": 12, "val": "single", "color": "000000", "space": "0"},
-        right={"sz": 12, "val": "single", "color": "000000", "space": "0"},
-    )
-    """
-    tc = cell._element
-    tcPr = tc.get_or_add_tcPr()
-
-    for border_name in ["top", "left", "bottom", "right"]:
-        border = kwargs.get(border_name)
-        if border:
-            element = OxmlElement(f"w:{border_name}")
-            for attr, value in border.items():
-                element.set(qn(f"w:{attr}"), str(value))
-            tcPr.append(element)
-
-def auto_shablon_generator(episodes_df, duration, processing_time):
-    # Получение текущего времени и форматирование в строку
-    dir_path = datetime.now().strftime("%Y_%m_%d_%H_%M_%S")
-
-    # Создание директории с именем текущего времени
-    os.makedirs(dir_path)
-
-    # Paths for output files
-    output_word_path = dir_path + '/polysomnography_report.docx'
-    output_pdf_path = dir_path + '/polysomnography_report.pdf'
-
-    doc = Document()
-
-    # Title
-    title = doc.add_heading('Отчет для врача ... по полисомнографической записи ...', level=1)
-    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
-
-    # Add technical report section
-    doc.add_heading('Технический отчет', level=2)
-    doc.add_paragraph(f'Проведен анализ ПСГ длительностью {duration} минут')
-    doc.add_paragraph(f'Оценивались сигналы типа ЭЭГ')
-    doc.add_paragraph(f'Время обработки составило {processing_time} секунд')
-
-    # Add clinical report section
-    doc.add_heading('Клинический отчет', level=2)
-
-    if episodes_df.empty:
-        breathing_disorder_presence = ''
-        doc.add_paragraph(f'По результатам анализа выявлено отсутствие признаков нарушений дыхания во сне')
-    else:
-        doc.add_paragraph(f'По результатам анализа выявлено наличие признаков нарушений дыхания во сне')
-        doc.add_paragraph(f'За время ПСГ выявлено {len(episodes_df)} эпизодов нарушения дыхания (НРД)')
-
-        # Add table
-        table = doc.add_table(rows=1, cols=5)
-        hdr_cells = table.rows[0].cells
-        headers = ['№ эпизода НРД', 'Время начала регистрации эпизода НРД, с', 'Время завершения регистрации НРД, с',
-                   'Длительность эпизода НРД, с', 'Тип эпизода НРД']
-        for i, header in enumerate(headers):
-            hdr_cells[i].text = header
-            set_cell_border(hdr_cells[i], top={"sz": 12, "val": "single", "color": "000000", "space": "0"},
-                            bottom={"sz": 12, "val": "single", "color": "000000", "space": "0"},
-                            left={"sz": 12, "val": "single", "color": "000000", "space": "0"},
-                            right={"sz": 12, "val": "single", "color": "000000", "space": "0"})
-
-        for index, row in episodes_df.iterrows():
-            row_cells = table.add_row().cells
-            row_cells[0].text = str(row["number"])
-            row_cells[1].text = str(row["start_time"])
-            row_cells[2].text = str(row["end_time"])
-            row_cells[3].text = str(row["duration"])
-            row_cells[4].text = row["type"]
-            for cell in row_cells:
-                set_cell_border(cell, top={"sz": 12, "val": "single", "color": "000000", "space": "0"},
-                                bottom={"sz": 12, "val": "single", "color": "000000", "space": "0"},
-                                left={"sz": 12, "val": "single", "color": "000000", "space": "0"},
-                                right={"sz": 12, "val": "single", "color": "000000", "space": "0"})
-
-        doc.add_heading('Характеристика длительности эпизодов нарушения дыхания', level=2)
-
-        # Длительность эпизода НРД, с
-        fig = go.Figure()
-        fig.add_trace(go.Box(y=episodes_df['duration']))
-        fig.update_xaxes(showticklabels=False)
-        fig.update_layout(template='plotly', title={
-            'text': "Длительность эпизода НРД, с",
-            'y': 0.9,
-            'x': 0.5,
-            'xanchor': 'center',
-            'yanchor': 'top',
-        }, )
-        fig.write_image(dir_path + '/image_graf.png')
-
-        doc.add_picture(dir_path + '/image_graf.png', width=Inches(6))
-
-        # Средняя длительность – […] секунд
-        doc.add_paragraph(f'Средняя длительность – {round(episodes_df['duration'].mean(), 2)} секунд')
-        # Медиана длительности НРД -- […] секунд
-        doc.add_paragraph(f'Медиана длительности НРД – {round(episodes_df['duration'].median(), 2)} секунд')
-        # Разброс длительности НРД -- от […] секунд до […] секунд
-        doc.add_paragraph(
-            f'Разброс длительности НРД - от {round(episodes_df['duration'].quantile(0.25), 2)} секунд до {round(episodes_df['duration'].quantile(0.75), 2)} секунд')
-        # round(float(mean_duration), 2), round(float(median_duration), 2), spread_duration
-
-        doc.add_heading('Анализ эпизодов нарушения дыхания в зависимости от времени регистрации', level=2)
-
-        # Количество разных типов апноэ за всю ночь
-        fig = go.Figure()
-        fig.add_trace(go.Bar(x=episodes_df[episodes_df["type"].str.contains("апноэ")]['type'].unique(),
-                             y=episodes_df[episodes_df["type"].str.contains("апноэ")]['type'].value_counts()))
-        fig.update_layout(template='plotly', title={
-            'text': "Количество разных типов апноэ за всю ночь",
-            'y': 0.9,
-            'x': 0.5,
-            'xanchor': 'center',
-            'yanchor': 'top',
-        }, )
-        fig.write_image(dir_path + '/image_graf1.png')
-
-        doc.add_picture(dir_path + '/image_graf1.png', width=Inches(6))
-
-        values_of_different_types_of_respiratory_disorders = episodes_df["type"].replace({
-            "центральное апноэ": "апноэ",
-            "обструктивное апноэ": "апноэ",
-            "апноэ": "апноэ",
-            "апноэ неопределенного типа": "апноэ"
-        })
-
-        # Количество разных типов нарушений дыхания
-        fig = go.Figure()
-        fig.add_trace(go.Bar(x=values_of_different_types_of_respiratory_disorders.unique(),
-                             y=values_of_different_types_of_respiratory_disorders.value_counts()))
-        fig.update_layout(template='plotly', title={
-            'text': "Количество разных типов нарушений дыхания",
-            'y': 0.9,
-            'x': 0.5,
-            'xanchor': 'center',
-            'yanchor': 'top',
-        }, )
-        fig.write_image(dir_path + '/image_graf2.png', scale=2)
-
-        doc.add_picture(dir_path + '/image_graf2.png', width=Inches(6))
-
-        # Распределение эпизодов НРД по первой, второй и последней третях ночного сна
-        fig = go.Figure()
-        fig.add_trace(go.Bar(x=['первая треть', 'вторая треть', 'последняя треть'],
-                             y=[len(episodes_df[episodes_df['start_time'] < duration / 3]),
-                                len(episodes_df[(episodes_df['start_time'] > duration / 3) & (
-                                            episodes_df['start_time'] < duration * 2 / 3)]),
-                                len(episodes_df[episodes_df['start_time'] > duration * 2 / 3])]))
-        fig.update_layout(template='plotly', title={
-            'text': "Распределение эпизодов НРД по третям ночного сна",
-            'y': 0.9,
-            'x': 0.5,
-            'xanchor': 'center',
-            'yanchor': 'top',
-        }, )
-        fig.write_image(dir_path + '/image_graf3.png', scale=2)
-
-        doc.add_picture(dir_path + '/image_graf3.png', width=Inches(6))
-
-    # Save the document
-    doc.save(output_word_path)
-
-    # Convert the document to PDF
-    convert(output_word_path, output_pdf_path)
-
-    return output_word_path, output_pdf_path
+def auto_shablon_generator(episodes_df, duration, processing_time=None, timings=None):
+    # Отчёт строится один раз и выводится в DOCX и PDF в памяти
+    reports = render_report(episodes_df, duration, processing_time, formats=('docx', 'pdf'), timings=timings)
+    return reports['docx'], reports['pdf']
 
 def div_maker(fig):
     return html.Div(
@@ -226,19 +56,39 @@ def lower_plot_generator(data):
 
     return div_maker(fig)
 
-def start_dash(data_poly, data_gipno, episodes, hertz, processing_time):
+def start_dash(data_poly, data_gipno, episodes, hertz, processing_time=None, downsample=True, pyramid=None, timings=None):
+    full_poly = data_poly
+    # Recording отдаётся просмотрщику как есть, для прореживания - DataFrame поверх него
+    if isinstance(data_poly, Recording):
+        data_poly = data_poly.to_df()
+    if isinstance(data_gipno, Recording):
+        data_gipno = data_gipno.to_df(time_column='timestamps')
     data_poly, data_gipno, duration = data_preprocessing(data_poly, data_gipno, hertz)
 
-    path_word, path_pdf = auto_shablon_generator(episodes, duration, processing_time)
+    # EpisodeTable дополнительно выделяется на графике по индексу эпизодов
+    episode_index = None
+    if isinstance(episodes, EpisodeTable):
+        episode_index = EpisodeIndex(episodes)
+        episodes = episodes.to_df()
+
+    report_word, report_pdf = auto_shablon_generator(episodes, duration, processing_time, timings)
 
     app = Dash(__name__)
     app._favicon = "images/icon3.png"
     app.title = "Результат анализа"
 
+    if downsample:
+        # Полное разрешение на сервере, в браузер - прореженный по масштабу фрагмент
+        upper_plot = upper_viewer(app, full_poly, data_gipno, hertz, pyramid, episode_index)
+        lower_plot = lower_viewer(app, full_poly, hertz, pyramid)
+    else:
+        upper_plot = upper_plot_generator(data_poly, data_gipno)
+        lower_plot = lower_plot_generator(data_poly)
+
     title_page = html.H1(children='Результаты анализа сна по ЭЭГ', className='title')
 
-    link_1 = html.A(children=html.Div(children=html.P('Загрузить отчёт .docx', className='download_button_lable'), className='link__button'), href='link/to/your/download/file', download=path_word)
-    link_2 = html.A(children=html.Div(children=html.P('Загрузить отчёт .pdf', className='download_button_lable'), className='link__button'), href='link/to/your/download/file', download=path_pdf)
+    link_1 = html.A(children=html.Div(children=html.P('Загрузить отчёт .docx', className='download_button_lable'), className='link__button'), href=download_href(report_word, 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'), download='polysomnography_report.docx')
+    link_2 = html.A(children=html.Div(children=html.P('Загрузить отчёт .pdf', className='download_button_lable'), className='link__button'), href=download_href(report_pdf, 'application/pdf'), download='polysomnography_report.pdf')
     link_place = html.Div(children=[link_1, link_2], className='link__place')
 
     report_message = html.H3('Загрузить полный отчёт на компьютер', className='report_message')
@@ -246,9 +96,9 @@ def start_dash(data_poly, data_gipno, episodes, hertz, processing_time):
 
     app.layout = html.Div(children=[
         title_page,
-        html.Div(children=upper_plot_generator(data_poly, data_gipno), className='upper_plot'),
+        html.Div(children=upper_plot, className='upper_plot'),
         html.Div(children='Показать ЭЭГ',className="lower-plot__button", id="test"),
-        html.Div(children=lower_plot_generator(data_poly), className='lower_plot', id='lowerplot'),
+        html.Div(children=lower_plot, className='lower_plot', id='lowerplot'),
         report_place],
         className='page')
     
@@ -296,11 +146,18 @@ def data_preprocessing(data_poly, data_gipno, hertz):
 
 if __name__ == "__main__":
     #input
-    data1 = pd.read_csv('full_data.csv')
-    data2 = pd.read_csv('hypno.csv')
+    timings = Timings()
+    with timings.span('load'):
+        data1 = pd.read_csv('full_data.csv')
+        data2 = pd.read_csv('hypno.csv')
+        episodes_data = pd.read_csv('episodes.csv')
     hertz = 200
-    processing_time = random.randrange(5,15)
-    episodes_data = pd.read_csv('episodes.csv')
+    # Пирамида для просмотрщика строится при первом запуске и дальше открывается с диска
+    with timings.span('load'):
+        signals = data1.select_dtypes('number')
+        pyramid = SignalPyramid.open_or_build(
+            Recording(signals.to_numpy().T, list(signals.columns), hertz), 'pyramid'
+        )
     #func
-    start_dash(data1, data2, episodes_data, hertz, processing_time)
+    start_dash(data1, data2, episodes_data, hertz, pyramid=pyramid, timings=timings)
 
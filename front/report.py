@@ -0,0 +1,280 @@
+import base64
+import io
+import os
+from contextlib import nullcontext
+from xml.sax.saxutils import escape
+
+from docx import Document
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+from docx.shared import Inches
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus import Image, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+from front.report_render import FIGURE_NAMES, RENDERER, report_figures
+
+# Шрифты с кириллицей для PDF; если ни один не найден, используется Helvetica
+PDF_FONT_PATHS = [
+    ('/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf', '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf'),
+    ('/usr/share/fonts/dejavu/DejaVuSans.ttf', '/usr/share/fonts/dejavu/DejaVuSans-Bold.ttf'),
+    ('C:\\Windows\\Fonts\\arial.ttf', 'C:\\Windows\\Fonts\\arialbd.ttf'),
+    ('/Library/Fonts/Arial Unicode.ttf', '/Library/Fonts/Arial Unicode.ttf'),
+]
+
+TABLE_HEADERS = ['№ эпизода НРД', 'Время начала регистрации эпизода НРД, с', 'Время завершения регистрации НРД, с',
+                 'Длительность эпизода НРД, с', 'Тип эпизода НРД']
+
+CELL_BORDER = {"sz": 12, "val": "single", "color": "000000", "space": "0"}
+
+# Названия этапов обработки в отчёте
+STAGE_NAMES = {
+    'load': 'Загрузка данных',
+    'filtering': 'Фильтрация сигналов',
+    'features': 'Построение признаков',
+    'detection': 'Разметка эпизодов',
+    'prediction': 'Предсказание модели',
+    'rendering': 'Формирование отчёта',
+}
+
+
+class Report:
+    def __init__(self):
+        """
+        Содержимое отчёта, не зависящее от формата: последовательность блоков
+        ('heading', текст, уровень), ('paragraph', текст),
+        ('table', заголовки, строки), ('image', PNG-изображение).
+        """
+        self.blocks = []
+
+    def add_heading(self, text, level):
+        self.blocks.append(('heading', text, level))
+
+    def add_paragraph(self, text):
+        self.blocks.append(('paragraph', text))
+
+    def add_table(self, headers, rows):
+        self.blocks.append(('table', headers, rows))
+
+    def add_image(self, image):
+        self.blocks.append(('image', image))
+
+
+def build_report(episodes_df, duration, processing_time=None, renderer=RENDERER, timings=None):
+    """
+    Строит содержимое отчёта по эпизодам нарушения дыхания.
+
+    :param episodes_df: DataFrame эпизодов (number, start_time, end_time, duration, type).
+    :param duration: Длительность записи.
+    :param processing_time: Время обработки, секунды (None - сумма замеров timings).
+    :param renderer: ReportRenderer для экспорта графиков.
+    :param timings: Замеры времени этапов (model.Timings) для технического отчёта;
+        время экспорта каждого графика добавляется в них (Timings.detail).
+    :return: Report.
+    """
+    stages = timings.totals() if timings is not None else {}
+    if processing_time is None:
+        processing_time = round(sum(stages.values()), 1)
+
+    report = Report()
+    report.add_heading('Отчет для врача ... по полисомнографической записи ...', 1)
+
+    report.add_heading('Технический отчет', 2)
+    report.add_paragraph(f'Проведен анализ ПСГ длительностью {duration} минут')
+    report.add_paragraph(f'Оценивались сигналы типа ЭЭГ')
+    report.add_paragraph(f'Время обработки составило {processing_time} секунд')
+    for stage, seconds in stages.items():
+        report.add_paragraph(f'{STAGE_NAMES.get(stage, stage)} – {round(seconds, 2)} секунд')
+
+    report.add_heading('Клинический отчет', 2)
+
+    if episodes_df.empty:
+        report.add_paragraph(f'По результатам анализа выявлено отсутствие признаков нарушений дыхания во сне')
+        return report
+
+    report.add_paragraph(f'По результатам анализа выявлено наличие признаков нарушений дыхания во сне')
+    report.add_paragraph(f'За время ПСГ выявлено {len(episodes_df)} эпизодов нарушения дыхания (НРД)')
+
+    rows = [
+        [str(row["number"]), str(row["start_time"]), str(row["end_time"]), str(row["duration"]), row["type"]]
+        for _, row in episodes_df.iterrows()
+    ]
+    report.add_table(TABLE_HEADERS, rows)
+
+    images, seconds = renderer.render(report_figures(episodes_df, duration))
+    if timings is not None:
+        for name, figure_seconds in zip(FIGURE_NAMES, seconds):
+            timings.detail(f'rendering.{name}', figure_seconds)
+
+    report.add_heading('Характеристика длительности эпизодов нарушения дыхания', 2)
+    report.add_image(images[0])
+    report.add_paragraph(f'Средняя длительность – {round(episodes_df["duration"].mean(), 2)} секунд')
+    report.add_paragraph(f'Медиана длительности НРД – {round(episodes_df["duration"].median(), 2)} секунд')
+    report.add_paragraph(
+        f'Разброс длительности НРД - от {round(episodes_df["duration"].quantile(0.25), 2)} секунд '
+        f'до {round(episodes_df["duration"].quantile(0.75), 2)} секунд')
+
+    report.add_heading('Анализ эпизодов нарушения дыхания в зависимости от времени регистрации', 2)
+    for image in images[1:]:
+        report.add_image(image)
+
+    return report
+
+
+def set_cell_border(cell, **kwargs):
+    """
+    Set cell's border
+    Usage:
+    set_cell_border(
+        cell,
+        top={"sz": 12, "val": "single", "color": "000000", "space": "0"},
+        bottom={"sz": 12, "val": "single", "color": "000000", "space": "0"},
+        left={"sz": 12, "val": "single", "color": "000000", "space": "0"},
+        right={"sz": 12, "val": "single", "color": "000000", "space": "0"},
+    )
+    """
+    tc = cell._element
+    tcPr = tc.get_or_add_tcPr()
+
+    for border_name in ["top", "left", "bottom", "right"]:
+        border = kwargs.get(border_name)
+        if border:
+            element = OxmlElement(f"w:{border_name}")
+            for attr, value in border.items():
+                element.set(qn(f"w:{attr}"), str(value))
+            tcPr.append(element)
+
+
+class DocxBackend:
+    extension = 'docx'
+
+    def render(self, report):
+        """
+        Отчёт в формате DOCX.
+
+        :param report: Report.
+        :return: Содержимое файла (bytes).
+        """
+        doc = Document()
+        for block in report.blocks:
+            kind = block[0]
+            if kind == 'heading':
+                heading = doc.add_heading(block[1], level=block[2])
+                if block[2] == 1:
+                    heading.alignment = WD_ALIGN_PARAGRAPH.CENTER
+            elif kind == 'paragraph':
+                doc.add_paragraph(block[1])
+            elif kind == 'table':
+                headers, rows = block[1], block[2]
+                table = doc.add_table(rows=1, cols=len(headers))
+                for cell, header in zip(table.rows[0].cells, headers):
+                    cell.text = header
+                    set_cell_border(cell, top=CELL_BORDER, bottom=CELL_BORDER, left=CELL_BORDER, right=CELL_BORDER)
+                for row in rows:
+                    for cell, value in zip(table.add_row().cells, row):
+                        cell.text = value
+                        set_cell_border(cell, top=CELL_BORDER, bottom=CELL_BORDER, left=CELL_BORDER, right=CELL_BORDER)
+            elif kind == 'image':
+                doc.add_picture(io.BytesIO(block[1]), width=Inches(6))
+
+        buffer = io.BytesIO()
+        doc.save(buffer)
+        return buffer.getvalue()
+
+
+class PdfBackend:
+    extension = 'pdf'
+
+    def __init__(self):
+        self.font, self.bold_font = register_pdf_fonts()
+
+    def render(self, report):
+        """
+        Отчёт в формате PDF.
+
+        :param report: Report.
+        :return: Содержимое файла (bytes).
+        """
+        styles = getSampleStyleSheet()
+        heading_styles = {
+            1: ParagraphStyle('h1', parent=styles['Heading1'], fontName=self.bold_font, alignment=1),
+            2: ParagraphStyle('h2', parent=styles['Heading2'], fontName=self.bold_font),
+        }
+        body = ParagraphStyle('body', parent=styles['Normal'], fontName=self.font, fontSize=11)
+        cell = ParagraphStyle('cell', parent=body, fontSize=9)
+        header_cell = ParagraphStyle('header_cell', parent=cell, fontName=self.bold_font)
+
+        story = []
+        for block in report.blocks:
+            kind = block[0]
+            if kind == 'heading':
+                story.append(Paragraph(escape(block[1]), heading_styles.get(block[2], heading_styles[2])))
+            elif kind == 'paragraph':
+                story.append(Paragraph(escape(block[1]), body))
+                story.append(Spacer(1, 4))
+            elif kind == 'table':
+                headers, rows = block[1], block[2]
+                data = [[Paragraph(escape(header), header_cell) for header in headers]]
+                data += [[Paragraph(escape(value), cell) for value in row] for row in rows]
+                table = Table(data, repeatRows=1)
+                table.setStyle(TableStyle([('GRID', (0, 0), (-1, -1), 1, colors.black),
+                                           ('VALIGN', (0, 0), (-1, -1), 'TOP')]))
+                story.append(table)
+            elif kind == 'image':
+                width, height = ImageReader(io.BytesIO(block[1])).getSize()
+                story.append(Image(io.BytesIO(block[1]), width=6 * inch, height=6 * inch * height / width))
+
+        buffer = io.BytesIO()
+        SimpleDocTemplate(buffer, pagesize=A4, leftMargin=40, rightMargin=40).build(story)
+        return buffer.getvalue()
+
+
+def register_pdf_fonts():
+    """
+    Регистрирует шрифт с кириллицей для PDF.
+
+    :return: Имена обычного и жирного шрифта.
+    """
+    for regular, bold in PDF_FONT_PATHS:
+        if os.path.exists(regular) and os.path.exists(bold):
+            if 'ReportFont' not in pdfmetrics.getRegisteredFontNames():
+                pdfmetrics.registerFont(TTFont('ReportFont', regular))
+                pdfmetrics.registerFont(TTFont('ReportFont-Bold', bold))
+            return 'ReportFont', 'ReportFont-Bold'
+    return 'Helvetica', 'Helvetica-Bold'
+
+
+BACKENDS = {'docx': DocxBackend, 'pdf': PdfBackend}
+
+
+def render_report(episodes_df, duration, processing_time=None, formats=('docx', 'pdf'), timings=None):
+    """
+    Строит отчёт один раз и выводит его во все запрошенные форматы в памяти.
+
+    :param episodes_df: DataFrame эпизодов.
+    :param duration: Длительность записи.
+    :param processing_time: Время обработки, секунды (None - сумма замеров timings).
+    :param formats: Форматы отчёта ('docx', 'pdf').
+    :param timings: Замеры времени этапов; формирование отчёта замеряется как этап rendering.
+    :return: Словарь формат -> содержимое файла (bytes).
+    """
+    with timings.span('rendering') if timings is not None else nullcontext():
+        report = build_report(episodes_df, duration, processing_time, timings=timings)
+        return {fmt: BACKENDS[fmt]().render(report) for fmt in formats}
+
+
+def download_href(content, mime):
+    """
+    Ссылка data: для скачивания отчёта прямо со страницы.
+
+    :param content: Содержимое файла (bytes).
+    :param mime: MIME-тип файла.
+    :return: Строка для атрибута href.
+    """
+    return f"data:{mime};base64,{base64.b64encode(content).decode()}"
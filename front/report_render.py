@@ -0,0 +1,119 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from model.Hypnogram import night_thirds
+
+
+def title_layout(text):
+    return {
+        'text': text,
+        'y': 0.9,
+        'x': 0.5,
+        'xanchor': 'center',
+        'yanchor': 'top',
+    }
+
+
+def report_figures(episodes_df, duration):
+    """
+    Графики отчёта по эпизодам нарушения дыхания.
+
+    :param episodes_df: DataFrame эпизодов (number, start_time, end_time, duration, type).
+    :param duration: Длительность записи, секунды.
+    :return: Список пар (фигура, масштаб экспорта) в порядке вывода в отчёт.
+    """
+    # Длительность эпизода НРД, с
+    fig_duration = go.Figure()
+    fig_duration.add_trace(go.Box(y=episodes_df['duration']))
+    fig_duration.update_xaxes(showticklabels=False)
+    fig_duration.update_layout(template='plotly', title=title_layout("Длительность эпизода НРД, с"), )
+
+    # Количество разных типов апноэ за всю ночь
+    apnoe_types = episodes_df[episodes_df["type"].str.contains("апноэ")]['type']
+    fig_apnoe = go.Figure()
+    fig_apnoe.add_trace(go.Bar(x=apnoe_types.unique(), y=apnoe_types.value_counts()))
+    fig_apnoe.update_layout(template='plotly', title=title_layout("Количество разных типов апноэ за всю ночь"), )
+
+    # Количество разных типов нарушений дыхания
+    values_of_different_types_of_respiratory_disorders = episodes_df["type"].replace({
+        "центральное апноэ": "апноэ",
+        "обструктивное апноэ": "апноэ",
+        "апноэ": "апноэ",
+        "апноэ неопределенного типа": "апноэ"
+    })
+    fig_types = go.Figure()
+    fig_types.add_trace(go.Bar(x=values_of_different_types_of_respiratory_disorders.unique(),
+                               y=values_of_different_types_of_respiratory_disorders.value_counts()))
+    fig_types.update_layout(template='plotly', title=title_layout("Количество разных типов нарушений дыхания"), )
+
+    # Распределение эпизодов НРД по первой, второй и последней третях ночного сна
+    fig_thirds = go.Figure()
+    fig_thirds.add_trace(go.Bar(x=['первая треть', 'вторая треть', 'последняя треть'],
+                                y=night_thirds(episodes_df['start_time'].to_numpy(), duration)))
+    fig_thirds.update_layout(template='plotly', title=title_layout("Распределение эпизодов НРД по третям ночного сна"), )
+
+    return [(fig_duration, 1), (fig_apnoe, 1), (fig_types, 2), (fig_thirds, 2)]
+
+
+# Названия графиков report_figures для замеров времени экспорта
+FIGURE_NAMES = ('duration', 'apnoe_types', 'disorder_types', 'thirds')
+
+
+class ReportRenderer:
+    def __init__(self, max_workers=4):
+        """
+        Рендер графиков отчёта в PNG в памяти.
+
+        Процесс экспорта изображений запускается один раз и остаётся запущенным,
+        графики отчёта экспортируются параллельно.
+
+        :param max_workers: Количество одновременно экспортируемых графиков.
+        """
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._started = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        """
+        Запускает процесс экспорта изображений, если он ещё не запущен.
+        """
+        with self._lock:
+            if self._started:
+                return
+            try:
+                import kaleido
+                start_server = getattr(kaleido, 'start_sync_server', None)
+            except ImportError:
+                start_server = None
+            if start_server is not None:
+                start_server(n=self.max_workers, silence_warnings=True)
+            else:
+                # Первый экспорт запускает процесс, который дальше переиспользуется
+                pio.to_image(go.Figure(), format='png')
+            self._started = True
+
+    def render(self, figures):
+        """
+        Экспортирует графики в PNG параллельно.
+
+        :param figures: Список пар (фигура, масштаб).
+        :return: Список PNG-изображений (bytes) и список времени экспорта каждого
+            графика в секундах, в том же порядке.
+        """
+        self.start()
+        results = list(self._executor.map(lambda item: self._render_one(*item), figures))
+        return [image for image, _ in results], [seconds for _, seconds in results]
+
+    def _render_one(self, fig, scale):
+        start = time.perf_counter()
+        image = pio.to_image(fig, format='png', scale=scale)
+        return image, time.perf_counter() - start
+
+
+# Общий рендерер процесса, чтобы не запускать экспорт заново для каждого отчёта
+RENDERER = ReportRenderer()
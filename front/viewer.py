@@ -0,0 +1,237 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from dash import dcc, html, no_update, Input, Output
+
+# Ширина графика в пикселях, под которую прореживаются сигналы
+PLOT_WIDTH_PX = 1600
+
+UPPER_COLUMNS = ['Airflow', 'Chest', 'Abdomen']
+# Цвет выделения эпизодов по типу
+EPISODE_COLORS = {'apnoe': 'red', 'hypapnoe': 'orange'}
+LOWER_COLUMNS = ['Fp1-M2', 'C3-M2', 'O1-M2', 'Fp2-M1', 'C4-M1', 'O2-M1']
+# Ключи relayoutData, при которых меняется диапазон оси X
+X_RANGE_KEYS = ('xaxis.range[0]', 'xaxis.range', 'xaxis.autorange')
+
+
+def minmax_decimate(values, n_buckets):
+    """
+    Индексы точек, сохраняющих огибающую сигнала: в каждом из n_buckets
+    интервалов берутся минимум и максимум.
+
+    :param values: Одномерный массив значений.
+    :param n_buckets: Количество интервалов.
+    :return: Отсортированный массив индексов.
+    """
+    n = len(values)
+    if n <= 2 * n_buckets:
+        return np.arange(n)
+    bucket = -(-n // n_buckets)
+    full = n // bucket * bucket
+    blocks = values[:full].reshape(-1, bucket)
+    offsets = np.arange(len(blocks)) * bucket
+    idx = [offsets + blocks.argmin(axis=1), offsets + blocks.argmax(axis=1)]
+    if full < n:
+        tail = values[full:]
+        idx.append(np.array([full + tail.argmin(), full + tail.argmax()]))
+    return np.unique(np.concatenate(idx))
+
+
+class ArraySource:
+    def __init__(self, channels, hertz):
+        """
+        Источник сигналов из массивов в памяти с min/max-прореживанием на лету.
+
+        :param channels: Словарь имя канала -> массив значений.
+        :param hertz: Частота дискретизации.
+        """
+        self.channels = channels
+        self.sfreq = hertz
+        self.duration = len(next(iter(channels.values()))) / hertz if channels else 0
+
+    def window(self, channel, t0, t1, n_points):
+        """
+        Возвращает прореженный до n_points точек сигнал канала на отрезке.
+
+        :param channel: Имя канала.
+        :param t0: Начало отрезка, секунды.
+        :param t1: Конец отрезка, секунды.
+        :param n_points: Число точек.
+        :return: Время точек в секундах и значения.
+        """
+        values = self.channels[channel]
+        start = max(int(t0 * self.sfreq) - 1, 0)
+        stop = min(int(np.ceil(t1 * self.sfreq)) + 1, len(values))
+        idx = start + minmax_decimate(values[start:stop], n_points // 2)
+        return idx / self.sfreq, values[idx]
+
+
+class SignalViewer:
+    def __init__(self, source, traces, hypno=None, start='00:00:00', width_px=PLOT_WIDTH_PX, episodes=None):
+        """
+        Просмотрщик сигналов, хранящий полное разрешение на сервере и
+        отдающий в браузер только прореженный по ширине графика фрагмент.
+
+        :param source: Источник сигналов (ArraySource или SignalPyramid).
+        :param traces: Список пар (имя канала, смещение по оси Y).
+        :param hypno: Пара (время в наносекундах, значения) для гипнограммы.
+        :param start: Время начала записи.
+        :param width_px: Ширина графика в пикселях.
+        :param episodes: EpisodeIndex для выделения эпизодов в видимом диапазоне.
+        """
+        self.source = source
+        self.traces = traces
+        self.hypno = hypno
+        self.origin = pd.Timestamp(start).value
+        self.width_px = width_px
+        self.episodes = episodes
+
+    def figure(self, x_range=None):
+        """
+        Строит фигуру для заданного диапазона времени.
+
+        :param x_range: Пара (начало, конец) в наносекундах или None для всей записи.
+        :return: go.Figure.
+        """
+        if x_range is None:
+            t0, t1 = 0, self.source.duration
+        else:
+            t0, t1 = ((x - self.origin) / 1e9 for x in x_range)
+
+        fig = go.Figure()
+        for name, offset in self.traces:
+            times, values = self.source.window(name, t0, t1, 2 * self.width_px)
+            x = self.origin + (np.asarray(times) * 1e9).astype(np.int64)
+            fig.add_trace(go.Scatter(
+                x=x.astype('datetime64[ns]'), y=values - offset, name=name
+            ))
+
+        if self.hypno is not None:
+            hypno_time, hypno_values = self.hypno
+            fig.add_trace(go.Scatter(
+                x=hypno_time.astype('datetime64[ns]'), y=hypno_values, name='gipno'
+            ))
+
+        if self.episodes is not None:
+            visible = self.episodes.overlapping(t0, t1)
+            for kind, start, end in zip(visible.kind, visible.start_time, visible.end_time):
+                fig.add_vrect(
+                    x0=pd.Timestamp(self.origin + int(start * 1e9)),
+                    x1=pd.Timestamp(self.origin + int(end * 1e9)),
+                    fillcolor=EPISODE_COLORS[visible.kinds[kind]], opacity=0.2, line_width=0,
+                )
+
+        fig.update_yaxes(showticklabels=False)
+        fig.update_xaxes(
+            tickformat="%H:%M:%S"
+        )
+        # Ползунок всегда показывает всю запись, хотя в трассах только видимый фрагмент
+        fig.update_xaxes(
+            rangeslider_visible=True,
+            rangeslider_autorange=False,
+            rangeslider_range=[
+                pd.Timestamp(self.origin),
+                pd.Timestamp(self.origin + int(self.source.duration * 1e9)),
+            ],
+        )
+        fig.update_layout(uirevision='viewer')
+        if x_range is not None:
+            fig.update_xaxes(range=[pd.Timestamp(x_range[0]), pd.Timestamp(x_range[1])])
+        return fig
+
+    def register(self, app, graph_id):
+        """
+        Создаёт график и регистрирует обновление прореживания при масштабировании.
+
+        :param app: Приложение Dash.
+        :param graph_id: Идентификатор графика.
+        :return: html.Div с графиком.
+        """
+        @app.callback(Output(graph_id, 'figure'), Input(graph_id, 'relayoutData'),
+                      prevent_initial_call=True)
+        def update(relayout):
+            # Масштаб по оси Y, autosize и смена режима не меняют видимый диапазон
+            if not relayout or not any(key in relayout for key in X_RANGE_KEYS):
+                return no_update
+            return self.figure(relayout_range(relayout))
+
+        return html.Div(
+            children=dcc.Graph(id=graph_id, figure=self.figure()),
+            style={"display": "flex", "justify-content": "center"},
+        )
+
+
+def relayout_range(relayout):
+    """
+    Извлекает диапазон оси X из relayoutData графика.
+
+    :param relayout: relayoutData.
+    :return: Пара (начало, конец) в наносекундах или None для всей записи.
+    """
+    if not relayout:
+        return None
+    if 'xaxis.range[0]' in relayout:
+        bounds = relayout['xaxis.range[0]'], relayout['xaxis.range[1]']
+    elif 'xaxis.range' in relayout:
+        bounds = relayout['xaxis.range']
+    else:
+        return None
+    return pd.Timestamp(bounds[0]).value, pd.Timestamp(bounds[1]).value
+
+
+def make_source(data_poly, hertz, columns, pyramid=None):
+    """
+    Источник сигналов: пирамида, если она построена, иначе массивы в памяти.
+
+    :param data_poly: DataFrame или Recording полиграммы с исходной частотой.
+    :param hertz: Частота дискретизации полиграммы.
+    :param columns: Нужные каналы.
+    :param pyramid: SignalPyramid исследования или None.
+    :return: Источник и список доступных каналов в порядке columns.
+    """
+    if pyramid is not None:
+        return pyramid, [column for column in columns if column in pyramid.channels]
+    available = [column for column in columns if column in data_poly.columns]
+    source = ArraySource({column: np.asarray(data_poly[column]) for column in available}, hertz)
+    return source, available
+
+
+def upper_viewer(app, data_poly, data_gipno, hertz, pyramid=None, episodes=None):
+    """
+    Верхний график (дыхательные каналы и гипнограмма) в полном разрешении
+    с прореживанием на сервере.
+
+    :param app: Приложение Dash.
+    :param data_poly: DataFrame или Recording полиграммы с исходной частотой.
+    :param data_gipno: DataFrame гипнограммы со столбцами Time и stage.
+    :param hertz: Частота дискретизации полиграммы.
+    :param pyramid: SignalPyramid исследования; если задана, уровни берутся из неё.
+    :param episodes: EpisodeIndex эпизодов для выделения на графике.
+    :return: html.Div с графиком.
+    """
+    source, columns = make_source(data_poly, hertz, UPPER_COLUMNS, pyramid)
+    traces = [(column, 0.005 * i) for i, column in enumerate(columns)]
+    hypno = None
+    if data_gipno is not None:
+        hypno = (
+            data_gipno['Time'].to_numpy().astype('datetime64[ns]').astype(np.int64),
+            data_gipno['stage'].to_numpy() / 900 - 0.0075 * len(columns),
+        )
+    viewer = SignalViewer(source, traces, hypno, episodes=episodes)
+    return viewer.register(app, 'upper-graph')
+
+
+def lower_viewer(app, data_poly, hertz, pyramid=None):
+    """
+    Нижний график (каналы ЭЭГ) в полном разрешении с прореживанием на сервере.
+
+    :param app: Приложение Dash.
+    :param data_poly: DataFrame или Recording полиграммы с исходной частотой.
+    :param hertz: Частота дискретизации полиграммы.
+    :param pyramid: SignalPyramid исследования; если задана, уровни берутся из неё.
+    :return: html.Div с графиком.
+    """
+    source, columns = make_source(data_poly, hertz, LOWER_COLUMNS, pyramid)
+    traces = [(column, 0.0005 * i) for i, column in enumerate(columns)]
+    viewer = SignalViewer(source, traces)
+    return viewer.register(app, 'lower-graph')
@@ -5,8 +5,14 @@ import json
 import os
 
 from .DataProcessor import DataProcessor
-
-from catboost import CatBoostRegressor
+from .Filtering import filter_recording
+from .Episodes import EpisodeTable
+from .Hypnogram import Hypnogram, sleep_bounds
+from .ModelRegistry import ModelRegistry
+from .SignalCache import SignalCache
+from .SignalPyramid import SignalPyramid
+from .Spectral import eeg_band_powers
+from .Timings import Timings, timed
 
 from sklearn.preprocessing import StandardScaler, MinMaxScaler
 from sklearn.model_selection import train_test_split
@@ -29,8 +35,9 @@ class Analyser:
     model_path = None
     scaler = None
 
-    df_poly = None
-    df_hypno = None
+    poly = None
+    hypno = None
+    pyramid = None
 
     XX = None
     yy = None
@@ -50,6 +57,8 @@ class Analyser:
         pretrained_model_path: str,
         system: str = None,
         default_scaler=MinMaxScaler(),
+        cache: SignalCache = None,
+        timings: Timings = None,
     ):
         """
         Инициализация анализатора.
@@ -58,38 +67,167 @@ class Analyser:
         :param pretrained_model_path: Путь к предобученной модели.
         :param system: Операционная система ('win' или 'mac').
         :param default_scaler: Масштабировщик по умолчанию (MinMaxScaler).
+        :param cache: Дисковый кэш декодированных записей.
+        :param timings: Замеры времени этапов (по умолчанию создаются новые).
         """
         self.dir_path = path
         self.system = system
         self.model_path = pretrained_model_path
         self.scaler = default_scaler
-        self.dp = DataProcessor(path)
+        self.timings = timings if timings is not None else Timings()
+        self.dp = DataProcessor(path, cache=cache, timings=self.timings)
+
+    @property
+    def df_poly(self):
+        """
+        Полиграмма в виде DataFrame поверх массива self.poly (без копирования).
+        """
+        return None if self.poly is None else self.poly.to_df()
+
+    @property
+    def df_hypno(self):
+        """
+        Гипнограмма в виде DataFrame со столбцами timestamps и stage.
+        """
+        return None if self.hypno is None else self.hypno.to_df(time_column="timestamps")
 
-    def get_record(self, patient_id, record_id, addname="", columns=[]):
+    def get_record(
+        self,
+        patient_id,
+        record_id,
+        addname="",
+        columns=[],
+        tmin=0.0,
+        tmax=None,
+        dtype=np.float32,
+        filters=None,
+        pyramid_dir=None,
+    ):
         """
         Получение записей полиграфии и гипнограммы пациента.
 
+        Сигналы сохраняются в self.poly и self.hypno (Recording), df_poly и
+        df_hypno строятся поверх них по запросу.
+
         :param patient_id: ID пациента.
         :param record_id: ID записи.
         :param addname: Дополнительное имя для файла.
-        :param columns: Список столбцов для извлечения.
+        :param columns: Список столбцов для извлечения (пустой - все столбцы).
+        :param tmin: Начало загружаемого фрагмента в секундах.
+        :param tmax: Конец загружаемого фрагмента в секундах.
+        :param dtype: Тип хранимых значений сигналов.
+        :param filters: Фильтры каналов полиграммы (как model.Filtering.FILTERS),
+            применяемые на месте до построения признаков и разметки; None - без фильтрации.
+        :param pyramid_dir: Директория min/max-пирамиды полиграммы для просмотрщика
+            (строится, если ещё не построена, и сохраняется в self.pyramid); None - без пирамиды.
         """
-        if self.dir_path is None:
-            if self.system == "win":
-                file_path = "C:\\Users\\TereschenkoAV3\\VSCodeProjects\\DFOHack\\Data"
-            else:
-                file_path = "/Users/fffgson/vscode/Python/MHDWork/DFOHack/Data"
-        else:
-            file_path = self.dir_path
+        raw = self.dp.fix_load_specific(
+            patient_id, record_id, picks=columns or None, tmin=tmin, tmax=tmax
+        )
 
-        result = []
-        for type in ["poly", "hypno"]:
-            raw = self.dp.fix_load_specific(file_path, patient_id, record_id)
-            data = self.dp.get_data(raw, patient_id, record_id, type)
-            df = self.dp.make_df(data)
-            result.append(df)
+        with self.timings.span("load"):
+            self.poly = self.dp.get_recording(
+                raw, patient_id, record_id, "poly", dtype=dtype
+            )
+            self.hypno = self.dp.get_recording(
+                raw, patient_id, record_id, "hypno", dtype=dtype
+            )
+            if pyramid_dir is not None:
+                self.pyramid = SignalPyramid.open_or_build(self.poly, pyramid_dir)
+        if filters is not None:
+            with self.timings.span("filtering"):
+                filter_recording(self.poly, filters)
 
-        self.df_poly, self.df_hypno = result[0], result[1]
+    def window_features(self, df, window=200, step=200):
+        """
+        Скользящие среднее и медиана, вычисленные только в точках шага.
+
+        Совпадает с df.rolling(window).mean()[window::step] и
+        df.rolling(window).median()[window::step], но считает окна только для
+        выходных точек: при window == step данные разбиваются на
+        непересекающиеся блоки без копирования, иначе берётся strided-view окон.
+
+        :param df: DataFrame с данными.
+        :param window: Размер окна.
+        :param step: Шаг окна.
+        :return: DataFrame средних и DataFrame медиан с индексом 0..N-1.
+        """
+        mean, median = _window_stats(df.to_numpy(dtype=np.float64), window, step)
+        mean_feat = pd.DataFrame(mean, columns=df.columns)
+        median_feat = pd.DataFrame(median, columns=df.columns)
+        return mean_feat, median_feat
+
+    @timed("features")
+    def build_features(
+        self,
+        df,
+        used_columns,
+        target,
+        window=200,
+        step=200,
+        shifts=[-30, -15, -5, 5, 15, 30],
+        dtype=np.float32,
+    ):
+        """
+        Построение матрицы признаков и целевой переменной.
+
+        Матрица итогового размера выделяется один раз, и блоки исходных
+        значений, оконных статистик и их сдвигов заполняются срезами.
+        Порядок столбцов: исходные, _mean, _median, затем для каждого сдвига
+        все они же с суффиксом _shifted{sh}, затем ratio и diff.
+
+        :param df: DataFrame с данными.
+        :param used_columns: Используемые столбцы.
+        :param target: Целевая переменная.
+        :param window: Размер окна для скользящего среднего и медианы.
+        :param step: Шаг окна.
+        :param shifts: Список сдвигов для признаков.
+        :param dtype: Тип данных матрицы признаков.
+        :return: Матрица признаков, целевая переменная (N x 1) и имена столбцов.
+        """
+        values = df[used_columns].to_numpy(dtype=np.float64)
+        base = values[window::step]
+        mean, median = _window_stats(values, window, step)
+        blocks = [base, mean, median]
+
+        block_columns = (
+            list(used_columns)
+            + [col + "_mean" for col in used_columns]
+            + [col + "_median" for col in used_columns]
+        )
+        columns = block_columns + [
+            col + f"_shifted{sh}" for sh in shifts for col in block_columns
+        ]
+        columns += ["ratio", "diff"]
+
+        n = len(base)
+        # Строки, для которых определены все сдвиги: запаздывание (sh > 0)
+        # отрезает начало, опережение (sh < 0) - конец
+        lag = max(max(shifts), 0) if shifts else 0
+        lead = max(-min(shifts), 0) if shifts else 0
+        rows = np.arange(lag, max(n - lead, lag))
+        width = len(used_columns)
+
+        X = np.empty((len(rows), len(columns)), dtype=dtype)
+        for k, block in enumerate(blocks):
+            X[:, k * width : (k + 1) * width] = block[rows]
+
+        offset = len(block_columns)
+        for sh in shifts:
+            src = rows - sh
+            valid = (src >= 0) & (src < n)
+            X[~valid, offset : offset + len(block_columns)] = np.nan
+            for k, block in enumerate(blocks):
+                X[valid, offset + k * width : offset + (k + 1) * width] = block[
+                    src[valid]
+                ]
+            offset += len(block_columns)
+
+        X[:, offset] = base[rows, -1] / median[rows, -1]
+        X[:, offset + 1] = base[rows, -1] - median[rows, -1]
+
+        y = df[target].to_numpy()[window::step][rows].reshape(-1, 1)
+        return X, y, columns
 
     def prep_XX_yy(
         self,
@@ -110,39 +248,11 @@ class Analyser:
         :param step: Шаг окна.
         :param shifts: Список сдвигов для признаков.
         """
-        feat = df[used_columns][window::step]
-        targ = df[target][window::step].reset_index().drop(columns="index")
-        mean_feat = (
-            df[used_columns]
-            .rolling(window=window)
-            .mean()[window::step]
-            .reset_index()
-            .drop(columns="index")
+        X, y, columns = self.build_features(
+            df, used_columns, target, window, step, shifts
         )
-        median_feat = (
-            df[used_columns]
-            .rolling(window=window)
-            .median()[window::step]
-            .reset_index()
-            .drop(columns="index")
-        )
-        for col in mean_feat.columns:
-            feat[col + "_mean"] = mean_feat[col]
-        for col in median_feat.columns:
-            feat[col + "_median"] = median_feat[col]
-        shifts_cols = feat.columns
-        for sh in shifts:
-            for col in shifts_cols:
-                feat[col + f"_shifted{sh}"] = feat[col].shift(sh)
-        for col in mean_feat.columns:
-            feat["ratio"] = feat[col] / feat[col + "_median"]
-            feat["diff"] = feat[col] - feat[col + "_median"]
-        tail = max(shifts)
-        XX = feat[tail:]
-        XX = XX[:-tail].reset_index().drop(columns="index")
-        yy = targ[tail:]
-        yy = yy[:-tail].reset_index().drop(columns="index")
-        self.XX, self.yy = XX, yy
+        self.XX = pd.DataFrame(X, columns=columns, copy=False)
+        self.yy = pd.DataFrame(y, columns=[target], copy=False)
 
     def prep_X_y(
         self,
@@ -161,39 +271,24 @@ class Analyser:
         :param step: Шаг окна.
         :param shifts: Список сдвигов для признаков.
         """
-        feat = self.df_poly[used_columns][window::step]
-        targ = self.df_poly[target][window::step].reset_index().drop(columns="index")
-        mean_feat = (
-            self.df_poly[used_columns]
-            .rolling(window=window)
-            .mean()[window::step]
-            .reset_index()
-            .drop(columns="index")
+        self.X, self.y, _ = self.build_features(
+            self.df_poly, used_columns, target, window, step, shifts
         )
-        median_feat = (
-            self.df_poly[used_columns]
-            .rolling(window=window)
-            .median()[window::step]
-            .reset_index()
-            .drop(columns="index")
+
+    @timed("features")
+    def eeg_features(self, channels=None, relative=False):
+        """
+        Мощность ЭЭГ в диапазонах delta, theta, alpha, sigma и beta по
+        30-секундным эпохам для всех отведений сразу.
+
+        :param channels: Отведения ЭЭГ (None - все имеющиеся в записи).
+        :param relative: Доли от суммарной мощности вместо абсолютной мощности.
+        :return: Список отведений и массив (отведения x эпохи x диапазоны).
+        """
+        self.eeg_channels, self.eeg_powers = eeg_band_powers(
+            self.poly, channels, relative=relative
         )
-        for col in mean_feat.columns:
-            feat[col + "_mean"] = mean_feat[col]
-        for col in median_feat.columns:
-            feat[col + "_median"] = median_feat[col]
-        shifts_cols = feat.columns
-        for sh in shifts:
-            for col in shifts_cols:
-                feat[col + f"_shifted{sh}"] = feat[col].shift(sh)
-        for col in mean_feat.columns:
-            feat["ratio"] = feat[col] / feat[col + "_median"]
-            feat["diff"] = feat[col] - feat[col + "_median"]
-        tail = max(shifts)
-        XX = feat[tail:]
-        XX = XX[:-tail].reset_index().drop(columns="index")
-        yy = targ[tail:]
-        yy = yy[:-tail].reset_index().drop(columns="index")
-        self.X, self.y = XX.values, yy.values
+        return self.eeg_channels, self.eeg_powers
 
     def split_scale(self, test_size=0.2):
         """
@@ -220,14 +315,19 @@ class Analyser:
             y_test_scaled,
         )
 
-    def get_predictions(self):
+    @timed("prediction")
+    def get_predictions(self, thread_count=-1):
         """
         Получение предсказаний модели на обучающей и тестовой выборках.
+
+        Модель загружается один раз на процесс и общая для всех анализаторов,
+        обе выборки предсказываются одним вызовом.
+
+        :param thread_count: Количество потоков CatBoost (-1 - все ядра).
         """
-        m = CatBoostRegressor()
-        m.load_model()
-        self.y_train_pred = m.predict(self.X_train)
-        self.y_test_pred = m.predict(self.X_test)
+        self.y_train_pred, self.y_test_pred = ModelRegistry.predict_batch(
+            self.model_path, [self.X_train, self.X_test], thread_count
+        )
 
     def wake_coords(self, hyp):
         """
@@ -236,14 +336,7 @@ class Analyser:
         :param hyp: Гипнограмма.
         :return: Начало и конец фаз сна.
         """
-        i, j = 0, len(hyp)
-        while (hyp[i] == 0) & (i != len(hyp) - 1):
-            i += 1
-        while (hyp[j - 1] == 0) & (j != 0):
-            j -= 1
-        if j <= i:
-            i, j = j, i
-        return i, j
+        return sleep_bounds(hyp)
 
     def count_amplitudes(self, i, df, window_big, window_small, num_parts):
         """
@@ -305,7 +398,38 @@ class Analyser:
 
         return small_amplitude, big_amplitude
 
-    def mark_episodes(self, df, hyp, big_window=60, small_window=4, num_parts=8):
+    def count_amplitudes_vectorized(
+        self, positions, df, window_big, window_small, num_parts
+    ):
+        """
+        Векторный расчёт амплитуд сразу для всех точек.
+
+        Скользящие максимумы и минимумы считаются за один проход по массиву,
+        после чего значения для каждой точки выбираются индексированием.
+        Результат совпадает с поэлементным вызовом count_amplitudes.
+
+        :param positions: Массив точек на графике.
+        :param df: DataFrame с данными.
+        :param window_big: Размер большого окна.
+        :param window_small: Размер маленького окна.
+        :param num_parts: Количество частей для большого окна.
+        :return: Массивы маленьких и больших амплитуд.
+        """
+        return _amplitudes(
+            df.Airflow.to_numpy(), positions, window_big, window_small, num_parts
+        )
+
+    @timed("detection")
+    def mark_episodes(
+        self,
+        df,
+        hyp,
+        big_window=60,
+        small_window=4,
+        num_parts=8,
+        engine="vectorized",
+        as_table=False,
+    ):
         """
         Основная функция для разметки эпизодов НДС в выбранном фрагменте.
 
@@ -314,17 +438,27 @@ class Analyser:
         :param big_window: Размер большого окна оценки амплитуды.
         :param small_window: Размер маленького окна оценки амплитуды.
         :param num_parts: Количество кусочков большого окна.
-        :return: Словарь с эпизодами апноэ и гипопноэ.
+        :param engine: Способ расчёта ('vectorized' или 'loop').
+        :param as_table: Вернуть EpisodeTable вместо словаря.
+        :return: Словарь с эпизодами апноэ и гипопноэ (или EpisodeTable).
         """
+        if engine == "vectorized":
+            table = self._mark_episodes_vectorized(
+                df, hyp, big_window, small_window, num_parts
+            )
+            return table if as_table else table.to_dict()
+        elif engine != "loop":
+            raise ValueError(f"Unknown engine: {engine}")
+
         window_big = 200 * big_window
         window_small = 200 * small_window
         start, end = self.wake_coords(hyp)
 
         episode_s_e = {"apnoe": [], "hypapnoe": []}
-        episode_idx = {"apnoe": [], "hypapnoe": []}
 
-        apnoe = []
-        hypapnoe = []
+        # Текущая серия окон хранится как интервал (первый, последний отсчёт)
+        apnoe = None
+        hypapnoe = None
         for i in range(
             start + window_big // 2, end - window_big // 2, window_small // 2
         ):
@@ -347,36 +481,301 @@ class Analyser:
                 ]
             )
 
+            first = i - window_small // 2
+            last = i + window_small // 2 - 1
             if small_amplitude < big_amplitude * 0.1:
-                apnoe += range(i - window_small // 2, i + window_small // 2)
-                episode_idx["apnoe"].append(i)
+                apnoe = (apnoe[0] if apnoe else first, last)
             elif (small_amplitude < big_amplitude * 0.5) & (max_sat - min_sat >= 4):
-                hypapnoe += range(i - window_small // 2, i + window_small // 2)
-                episode_idx["hypapnoe"].append(i)
+                hypapnoe = (hypapnoe[0] if hypapnoe else first, last)
             else:
                 if apnoe:
-                    episode_s_e["apnoe"].append((apnoe[0], apnoe[-1]))
+                    episode_s_e["apnoe"].append(apnoe)
                 elif hypapnoe:
-                    episode_s_e["hypapnoe"].append((hypapnoe[0], hypapnoe[-1]))
-                apnoe = []
-                hypapnoe = []
+                    episode_s_e["hypapnoe"].append(hypapnoe)
+                apnoe = None
+                hypapnoe = None
+
+        return EpisodeTable.from_dict(episode_s_e) if as_table else episode_s_e
+
+    def _mark_episodes_vectorized(self, df, hyp, big_window, small_window, num_parts):
+        """
+        Векторная реализация mark_episodes, дающая тот же результат, что и цикл.
+
+        :param df: DataFrame с данными.
+        :param hyp: Гипнограмма.
+        :param big_window: Размер большого окна оценки амплитуды.
+        :param small_window: Размер маленького окна оценки амплитуды.
+        :param num_parts: Количество кусочков большого окна.
+        :return: EpisodeTable.
+        """
+        window_big = 200 * big_window
+        window_small = 200 * small_window
+        start, end = self.wake_coords(hyp)
 
-        return episode_s_e
+        positions = np.arange(
+            start + window_big // 2, end - window_big // 2, window_small // 2
+        )
+        is_apnoe, is_hypapnoe = _classify_windows(
+            df.Airflow.to_numpy(),
+            df.SaO2.to_numpy(),
+            positions,
+            window_big,
+            window_small,
+            small_window,
+            num_parts,
+        )
+        return EpisodeTable.from_windows(
+            positions, is_apnoe, is_hypapnoe, window_small // 2
+        )
+
+    def episodes_df(self, episode_s_e, sfreq=200):
+        """
+        Преобразование размеченных эпизодов в таблицу для отчёта.
+
+        :param episode_s_e: Словарь с эпизодами апноэ и гипопноэ или EpisodeTable.
+        :param sfreq: Частота дискретизации.
+        :return: DataFrame со столбцами number, start_time, end_time, duration, type.
+        """
+        if not isinstance(episode_s_e, EpisodeTable):
+            episode_s_e = EpisodeTable.from_dict(episode_s_e, sfreq)
+        return episode_s_e.to_df()
 
     def automark(
-        self, patient_id, record_id, df, hyp, big_window=60, small_window=4, num_parts=8
+        self,
+        patient_id,
+        record_id,
+        df=None,
+        hyp=None,
+        big_window=60,
+        small_window=4,
+        num_parts=8,
+        filters=None,
     ):
         """
         Автоматическая разметка эпизодов для заданного пациента и записи.
 
+        Запись загружается в self.poly и self.hypno; если df и hyp не заданы,
+        берутся полиграмма и гипнограмма записи (гипнограмма приводится к
+        отсчётам полиграммы).
+
         :param patient_id: ID пациента.
         :param record_id: ID записи.
         :param df: DataFrame с данными.
-        :param hyp: Гипнограмма.
+        :param hyp: Гипнограмма по отсчётам полиграммы.
         :param big_window: Размер большого окна оценки амплитуды.
         :param small_window: Размер маленького окна оценки амплитуды.
         :param num_parts: Количество кусочков большого окна.
-        :return: Размеченные эпизоды.
+        :param filters: Фильтры каналов (см. get_record); None - без фильтрации.
+        :return: Размеченные эпизоды (EpisodeTable).
+        """
+        self.get_record(patient_id, record_id, filters=filters)
+        if df is None:
+            df = self.df_poly
+        if hyp is None:
+            hyp = Hypnogram.from_samples(
+                self.hypno["stage"], self.hypno.sfreq
+            ).to_samples(self.poly.sfreq, self.poly.n_samples)
+        return self.mark_episodes(
+            df, hyp, big_window, small_window, num_parts, as_table=True
+        )
+
+
+def _window_stats(values, window, step):
+    """
+    Среднее и медиана окон values[end - window + 1 : end + 1] для точек
+    end = window, window + step, ... (как rolling(window)[window::step]).
+
+    :param values: Двумерный массив (отсчёты x столбцы).
+    :param window: Размер окна.
+    :param step: Шаг окна.
+    :return: Массивы средних и медиан (точки x столбцы).
+    """
+    ends = np.arange(window, len(values), step)
+    if window == step:
+        windows = values[1 : 1 + len(ends) * window].reshape(
+            len(ends), window, values.shape[1]
+        )
+        axis = 1
+    else:
+        windows = np.lib.stride_tricks.sliding_window_view(values, window, axis=0)[
+            ends - window + 1
+        ]
+        axis = 2
+    return windows.mean(axis=axis), np.median(windows, axis=axis)
+
+
+def _amplitudes(airflow, positions, window_big, window_small, num_parts):
+    """
+    Маленькие и большие амплитуды Airflow для массива центров окон
+    (то же, что count_amplitudes для каждой точки).
+
+    :param airflow: Массив значений Airflow.
+    :param positions: Массив точек на графике.
+    :param window_big: Размер большого окна.
+    :param window_small: Размер маленького окна.
+    :param num_parts: Количество частей для большого окна.
+    :return: Массивы маленьких и больших амплитуд.
+    """
+    positions = np.asarray(positions, dtype=np.int64)
+    part_size = (window_big - window_small) // num_parts
+
+    small_starts = positions - window_small // 2
+    small_width = 2 * (window_small // 2)
+    small_max = _extremum(airflow, small_starts, small_width, np.maximum)
+    small_min = _extremum(airflow, small_starts, small_width, np.minimum)
+    small_amplitude = np.abs(small_max - small_min)
+
+    part_starts = []
+    for j in range(num_parts // 2):
+        part_starts.append(positions - window_big // 2 + j * part_size)
+        part_starts.append(positions + window_big // 2 - (j + 1) * part_size)
+    part_starts = np.stack(part_starts, axis=1)
+
+    big_max = np.median(
+        _extremum(airflow, part_starts, part_size, np.maximum), axis=1
+    )
+    big_min = np.median(
+        _extremum(airflow, part_starts, part_size, np.minimum), axis=1
+    )
+    big_amplitude = np.abs(big_max - big_min)
+
+    return small_amplitude, big_amplitude
+
+
+def _classify_windows(
+    airflow, sat, positions, window_big, window_small, small_window, num_parts
+):
+    """
+    Отметки окон апноэ и гипопноэ по правилам mark_episodes.
+
+    :param airflow: Массив значений Airflow.
+    :param sat: Массив значений SaO2.
+    :param positions: Массив центров окон.
+    :param window_big: Размер большого окна, отсчёты.
+    :param window_small: Размер маленького окна, отсчёты.
+    :param small_window: Размер маленького окна, секунды (сдвиг окна SaO2).
+    :param num_parts: Количество кусочков большого окна.
+    :return: Маски окон апноэ и гипопноэ.
+    """
+    small_amplitude, big_amplitude = _amplitudes(
+        airflow, positions, window_big, window_small, num_parts
+    )
+
+    sat_starts = positions - window_big // 2 + small_window
+    sat_width = 2 * (window_big // 2)
+    sat_range = _extremum(
+        sat, sat_starts, sat_width, np.maximum
+    ) - _extremum(sat, sat_starts, sat_width, np.minimum)
+
+    is_apnoe = small_amplitude < big_amplitude * 0.1
+    is_hypapnoe = ~is_apnoe & (small_amplitude < big_amplitude * 0.5) & (
+        sat_range >= 4
+    )
+    return is_apnoe, is_hypapnoe
+
+
+def _window_extremum(values, starts, width, ufunc):
+    """
+    Максимум (ufunc=np.maximum) или минимум (ufunc=np.minimum) окон
+    values[start:start + width] для массива начал окон.
+
+    Скользящий экстремум считается блочным разложением (van Herk/Gil-Werman):
+    массив делится на блоки длины width, внутри блоков строятся префиксные и
+    суффиксные накопления, и экстремум любого окна равен ufunc от суффикса
+    первого блока и префикса следующего. Окна, выходящие за конец массива,
+    обрезаются, как при срезе.
+
+    :param values: Одномерный массив значений.
+    :param starts: Массив (любой формы) начал окон.
+    :param width: Ширина окна.
+    :param ufunc: np.maximum или np.minimum.
+    :return: Массив экстремумов той же формы, что и starts.
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    if width <= 0:
+        raise ValueError("Window width must be positive.")
+    if starts.size == 0:
+        return np.empty(starts.shape, dtype=np.float64)
+    if starts.min() < 0:
+        raise ValueError("Window start must be non-negative.")
+
+    fill = -np.inf if ufunc is np.maximum else np.inf
+    n_blocks = -(-(int(starts.max()) + width) // width)
+    padded = np.full(n_blocks * width, fill)
+    size = min(len(values), len(padded))
+    padded[:size] = values[:size]
+
+    blocks = padded.reshape(n_blocks, width)
+    prefix = ufunc.accumulate(blocks, axis=1).ravel()
+    suffix = ufunc.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+
+    result = ufunc(suffix[starts], prefix[starts + width - 1])
+    if np.isinf(result).any():
+        raise ValueError("Window is out of the data range.")
+    return result
+
+
+def _extremum(values, starts, width, ufunc):
+    """
+    Экстремум окон для массива значений или для заранее посчитанных
+    скользящих экстремумов (_SlidingExtrema).
+    """
+    if isinstance(values, _SlidingExtrema):
+        return values.take(starts, width, ufunc)
+    return _window_extremum(values, starts, width, ufunc)
+
+
+class _SlidingExtrema:
+    def __init__(self, values):
+        """
+        Скользящие максимумы и минимумы сигнала для окон любой ширины
+        (разреженная таблица): для уровней k хранятся экстремумы окон длины
+        2**k от каждого отсчёта, и экстремум окна ширины width равен ufunc от
+        двух перекрывающихся окон уровня floor(log2(width)). Уровни строятся
+        один раз удвоением и общие для всех окон, поэтому запрос окон любой
+        ширины сводится к двум выборкам по индексам.
+
+        :param values: Одномерный массив значений.
+        """
+        values = np.asarray(values)
+        self.values = values if values.dtype.kind == "f" else values.astype(np.float64)
+        self._levels = {}
+
+    def precompute(self, *widths):
+        """
+        Строит уровни, нужные для окон ширины widths (остальные уровни не хранятся).
+        """
+        if min(widths) <= 0:
+            raise ValueError("Window width must be positive.")
+        levels = {int(width).bit_length() - 1 for width in widths}
+        for ufunc in (np.maximum, np.minimum):
+            needed = sorted(level for level in levels if (level, ufunc.__name__) not in self._levels)
+            if not needed:
+                continue
+            n = len(self.values)
+            current = self.values.copy()
+            for level in range(needed[-1] + 1):
+                if level in needed:
+                    self._levels[(level, ufunc.__name__)] = current.copy()
+                half = 1 << level
+                if half < n:
+                    ufunc(current[: n - half], current[half:], out=current[: n - half])
+
+    def take(self, starts, width, ufunc):
+        """
+        То же, что _window_extremum(values, starts, width, ufunc).
         """
-        raw = self.dp.fix_load_specific(patient_id, record_id)
-        return
+        starts = np.asarray(starts, dtype=np.int64)
+        self.precompute(width)
+        if starts.size == 0:
+            return np.empty(starts.shape, dtype=np.float64)
+        if starts.min() < 0:
+            raise ValueError("Window start must be non-negative.")
+        n = len(self.values)
+        if starts.max() >= n:
+            raise ValueError("Window is out of the data range.")
+        level = int(width).bit_length() - 1
+        table = self._levels[(level, ufunc.__name__)]
+        # Второе окно уровня заканчивается в конце окна (у конца массива - на последнем отсчёте)
+        last = np.minimum(starts + (width - (1 << level)), n - 1)
+        return ufunc(table[starts], table[last]).astype(np.float64)
@@ -1,20 +1,41 @@
+import numpy as np
 import pandas as pd
-import mne
 import os
 import codecs
+import traceback
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .EdfFile import EdfFile
+from .Recording import Recording
+from .RecordStore import RecordStore
+from .SignalCache import SignalCache
+from .SignalPyramid import SignalPyramid
+from .Timings import Timings
 
 
 class DataProcessor:
-    def __init__(self, dir_path: str, system: str = None):
+    def __init__(
+        self,
+        dir_path: str,
+        system: str = None,
+        cache: SignalCache = None,
+        timings: Timings = None,
+    ):
         if not isinstance(dir_path, str):
             raise ValueError("The path must be a string.")
         self.dir_path = dir_path
         self.system = system
+        self.cache = cache
+        self.timings = timings if timings is not None else Timings()
 
     def fix_file(self, dirpath: str, file: str) -> str:
         """
         Исправляет формат и переименовывает файл в формате REC или гипнограмму в формат EDF.
 
+        Изменяет файлы на диске; загрузка (fix_load_specific) этот метод не
+        использует и исправляет заголовок в памяти через EdfFile.
+
         Parameters:
         dirpath (str): Путь к директории, содержащей файл.
         file (str): Имя файла для обработки.
@@ -51,67 +72,179 @@ class DataProcessor:
         os.rename(full_path, new_file)
         return new_file
 
-    def load_raw_file(self, dirpath: str, file: str, verbose: int = 0):
+    def load_raw_file(
+        self,
+        dirpath: str,
+        file: str,
+        verbose: int = 0,
+        picks: list = None,
+        tmin: float = 0.0,
+        tmax: float = None,
+        preload: bool = True,
+    ):
         """
         Загружает и возвращает файл данных в формате EDF.
 
+        Если заданы каналы или временной диапазон, файл открывается без
+        предзагрузки, обрезается и только затем выбранный фрагмент читается
+        с диска, так что в память попадают лишь нужные данные.
+
+        Если задан кэш, запись берётся из него, а при промахе декодируется
+        целиком и сохраняется в кэш.
+
+        Файл открывается только для чтения через EdfFile: заголовок файлов REC
+        исправляется в памяти, выборочная загрузка работает и для них.
+
         Parameters:
+        dirpath (str): Путь к директории, содержащей файл.
         file (str): Путь к файлу.
         verbose (int): Уровень детализации сообщений (0 для отключения).
+        picks (list): Список каналов для загрузки (None - все каналы).
+        tmin (float): Начало фрагмента в секундах.
+        tmax (float): Конец фрагмента в секундах (None - до конца записи).
+        preload (bool): Загрузить ли выбранный фрагмент в память.
 
         Returns:
         mne.io.Raw: Загруженный файл данных.
         """
-        raw_file = mne.io.read_raw_edf(
-            os.path.join(dirpath, file), preload=True, verbose=verbose
-        )
+        path = os.path.join(dirpath, file)
+        if self.cache is not None:
+            raw_file = self.cache.load(path, picks=picks, tmin=tmin, tmax=tmax)
+            if raw_file is not None:
+                return raw_file
+            raw_file = EdfFile(path).read_raw(preload=True, verbose=verbose)
+            self.cache.store(path, raw_file)
+        elif picks is None and not tmin and tmax is None:
+            return EdfFile(path).read_raw(preload=preload, verbose=verbose)
+        else:
+            raw_file = EdfFile(path).read_raw(preload=False, verbose=verbose)
+
+        if tmin or tmax is not None:
+            last = raw_file.times[-1]
+            raw_file.crop(
+                tmin=min(tmin, last),
+                tmax=last if tmax is None else min(tmax, last),
+            )
+        if picks is not None:
+            raw_file.pick([ch for ch in picks if ch in raw_file.ch_names])
+        if preload:
+            raw_file.load_data(verbose=verbose)
         return raw_file
 
-    def fix_load_all(self) -> list:
+    def find_record_dirs(self) -> list:
         """
-        Обрабатывает и загружает все файлы в директории.
-
-        Parameters:
-        path (str): Путь к директории с файлами.
-        system (str): Операционная система (win или другой).
+        Находит директории исследований вида "Np */Nr *" без смены рабочей директории.
 
         Returns:
-        list: Список обработанных данных.
+        list: Список кортежей (номер пациента, номер исследования).
         """
         result = []
-        separator = "\\" if self.system == "win" else "/"
-        os.chdir(self.dir_path)
+        for patient_dir in sorted(os.listdir(self.dir_path)):
+            patient_path = os.path.join(self.dir_path, patient_dir)
+            if not patient_dir.startswith("Np ") or not os.path.isdir(patient_path):
+                continue
+            for record_dir in sorted(os.listdir(patient_path)):
+                record_path = os.path.join(patient_path, record_dir)
+                if not record_dir.startswith("Nr ") or not os.path.isdir(record_path):
+                    continue
+                result.append((int(patient_dir[3:]), int(record_dir[3:])))
+        return result
 
-        for dirpath, _, filenames in os.walk("."):
-            pre_result = {}
-            for file in filenames:
-                if file == ".DS_Store":
+    def iter_load_all(self, n_workers: int = None, errors: dict = None, **load_kwargs):
+        """
+        Параллельно обрабатывает и загружает все исследования в директории.
+
+        Сначала находятся все директории исследований, затем каждое исследование
+        исправляется и загружается в отдельном процессе. Записи возвращаются по
+        мере готовности, так что анализ первых записей можно начинать, пока
+        остальные ещё загружаются. Ошибка загрузки одного исследования не
+        прерывает загрузку остальных.
+
+        Parameters:
+        n_workers (int): Количество процессов (None - по числу ядер).
+        errors (dict): Словарь для ошибок загрузки: (пациент, исследование) ->
+            текст исключения; None - ошибки выводятся предупреждениями.
+        load_kwargs: Параметры выборочной загрузки (picks, tmin, tmax).
+
+        Returns:
+        generator: Генератор записей Record в порядке завершения загрузки.
+        """
+        record_dirs = self.find_record_dirs()
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            futures = {
+                executor.submit(
+                    _fix_load_record,
+                    self.dir_path,
+                    self.system,
+                    self.cache,
+                    patient_id,
+                    record_id,
+                    load_kwargs,
+                ): (patient_id, record_id)
+                for patient_id, record_id in record_dirs
+            }
+            for future in as_completed(futures):
+                try:
+                    record = future.result()
+                except Exception as e:
+                    _load_failed(futures[future], e, errors)
                     continue
-                new_file = DataProcessor.fix_file(dirpath, file)
+                if record is not None:
+                    yield record
+
+    def fix_load_all(self, n_workers: int = 1, errors: dict = None, **load_kwargs) -> RecordStore:
+        """
+        Обрабатывает и загружает все файлы в директории.
 
-                patient = int(new_file.split(separator)[-2][3:])
-                record = int(new_file.split(separator)[-1][3:])
+        Parameters:
+        n_workers (int): Количество процессов (1 - последовательная загрузка,
+            None - по числу ядер).
+        errors (dict): Словарь для ошибок загрузки исследований (как в iter_load_all).
+        load_kwargs: Параметры выборочной загрузки (picks, tmin, tmax).
 
-                pre_result["patient"] = patient
-                pre_result["record"] = record
+        Returns:
+        RecordStore: Хранилище обработанных данных.
+        """
+        if n_workers == 1:
+            return RecordStore(self._iter_load_sequential(errors, load_kwargs))
+        return RecordStore(self.iter_load_all(n_workers, errors, **load_kwargs))
+
+    def _iter_load_sequential(self, errors, load_kwargs):
+        for patient_id, record_id in self.find_record_dirs():
+            try:
+                record = self.fix_load_specific(patient_id, record_id, **load_kwargs).get(
+                    patient_id, record_id
+                )
+            except Exception as e:
+                _load_failed((patient_id, record_id), e, errors)
+                continue
+            if record is not None:
+                yield record
 
-                if new_file.endswith("poly.EDF"):
-                    pre_result["poly"] = DataProcessor.load_raw_file(new_file)
-                elif new_file.endswith("hypno.EDF"):
-                    pre_result["hypno"] = DataProcessor.load_raw_file(new_file)
+    def find_record(self, raw_data, patient_id: int, record_id: int):
+        """
+        Возвращает запись для указанного пациента и исследования.
 
-            if pre_result:
-                result.append(pre_result)
-        return result
+        Parameters:
+        raw_data (RecordStore): Хранилище загруженных данных (или список словарей).
+        patient_id (int): Номер пациента.
+        record_id (int): Номер исследования.
+
+        Returns:
+        Record: Запись исследования или None.
+        """
+        if not isinstance(raw_data, RecordStore):
+            raw_data = RecordStore(raw_data)
+        return raw_data.get(patient_id, record_id)
 
     def get_freq(
-        self, raw_data: list, N_patient: int, N_record: int, record_type: str
+        self, raw_data: RecordStore, N_patient: int, N_record: int, record_type: str
     ) -> float:
         """
         Возвращает частоту дискретизации для указанного пациента и исследования.
 
         Parameters:
-        raw_data (list): Список загруженных данных.
+        raw_data (RecordStore): Хранилище загруженных данных.
         N_patient (int): Номер пациента.
         N_record (int): Номер исследования.
         record_type (str): Тип исследования (poly или hypno).
@@ -119,39 +252,39 @@ class DataProcessor:
         Returns:
         float: Частота дискретизации.
         """
-        for i in raw_data:
-            if i["patient"] == N_patient and i["record"] == N_record:
-                return i[record_type].info["sfreq"]
+        i = self.find_record(raw_data, N_patient, N_record)
+        if i is not None:
+            return i[record_type].info["sfreq"]
         return -1.0
 
     def get_info(
-        self, raw_data: list, patient_id: int, record_id: int, record_type: str
+        self, raw_data: RecordStore, patient_id: int, record_id: int, record_type: str
     ) -> dict:
         """
-        Возвращает частоту дискретизации для указанного пациента и исследования.
+        Возвращает информацию для указанного пациента и исследования.
 
         Parameters:
-        raw_data (list): Список загруженных данных.
-        N_patient (int): Номер пациента.
-        N_record (int): Номер исследования.
+        raw_data (RecordStore): Хранилище загруженных данных.
+        patient_id (int): Номер пациента.
+        record_id (int): Номер исследования.
         record_type (str): Тип исследования (poly или hypno).
 
         Returns:
         dict: Информация об исследовании
         """
-        for i in raw_data:
-            if i["patient"] == patient_id and i["record"] == record_id:
-                return dict(i[record_type].info)
+        i = self.find_record(raw_data, patient_id, record_id)
+        if i is not None:
+            return dict(i[record_type].info)
         return dict()
 
     def get_data(
-        self, raw_data: list, patient_id: int, record_id: int, record_type: str
+        self, raw_data: RecordStore, patient_id: int, record_id: int, record_type: str
     ) -> dict:
         """
         Возвращает данные исследования для указанного пациента и исследования.
 
         Parameters:
-        raw_data (list): Список загруженных данных.
+        raw_data (RecordStore): Хранилище загруженных данных.
         patient_id (int): Номер пациента.
         record_id (int): Номер исследования.
         record_type (str): Тип исследования (poly или hypno).
@@ -159,22 +292,57 @@ class DataProcessor:
         Returns:
         dict: Данные исследования.
         """
-        for i in raw_data:
-            if i["patient"] == patient_id and i["record"] == record_id:
-                if record_type == "poly":
-                    data = i[record_type].get_data()
-                    channels = i[record_type].ch_names
-                    return {"record_type": record_type, **dict(zip(channels, data))}
-                elif record_type == "hypno":
-                    hypno_data = i[record_type][0][0].flatten()
-                    hypno_timestamps = i[record_type][0][1].flatten()
-                    return {
-                        "record_type": record_type,
-                        "timestamps": hypno_timestamps,
-                        "stage": hypno_data,
-                    }
+        i = self.find_record(raw_data, patient_id, record_id)
+        if i is not None:
+            if record_type == "poly":
+                data = i[record_type].get_data()
+                channels = i[record_type].ch_names
+                return {"record_type": record_type, **dict(zip(channels, data))}
+            elif record_type == "hypno":
+                hypno_data = i[record_type][0][0].flatten()
+                hypno_timestamps = i[record_type][0][1].flatten()
+                return {
+                    "record_type": record_type,
+                    "timestamps": hypno_timestamps,
+                    "stage": hypno_data,
+                }
         return {}
 
+    def get_recording(
+        self,
+        raw_data: RecordStore,
+        patient_id: int,
+        record_id: int,
+        record_type: str,
+        dtype=np.float32,
+    ) -> Recording:
+        """
+        Возвращает сигналы исследования одним массивом без промежуточных копий.
+
+        Для гипнограммы берётся первый канал под именем stage, как в get_data.
+
+        Parameters:
+        raw_data (RecordStore): Хранилище загруженных данных.
+        patient_id (int): Номер пациента.
+        record_id (int): Номер исследования.
+        record_type (str): Тип исследования (poly или hypno).
+        dtype: Тип хранимых значений.
+
+        Returns:
+        Recording: Сигналы исследования или None.
+        """
+        i = self.find_record(raw_data, patient_id, record_id)
+        if i is None or record_type not in i:
+            return None
+        raw = i[record_type]
+        if record_type == "poly":
+            return Recording.from_raw(raw, dtype=dtype)
+        elif record_type == "hypno":
+            return Recording.from_raw(
+                raw, picks=raw.ch_names[:1], ch_names=["stage"], dtype=dtype
+            )
+        return None
+
     def make_df(self, data: dict) -> pd.DataFrame:
         """
         Преобразует данные исследования в DataFrame.
@@ -187,18 +355,30 @@ class DataProcessor:
         """
         return pd.DataFrame(data).drop(columns="record_type")
 
-    def fix_load_specific(self, patient_id: int, record_id: int) -> list:
+    def fix_load_specific(
+        self,
+        patient_id: int,
+        record_id: int,
+        picks: list = None,
+        tmin: float = 0.0,
+        tmax: float = None,
+    ) -> RecordStore:
         """
         Загружает данные для указанного пациента и исследования.
 
+        Файлы не изменяются и не переименовываются: роль файла определяется
+        по расширению, заголовок при необходимости исправляется в памяти,
+        поэтому загрузка работает на архивах только для чтения.
+
         Parameters:
-        path (str): Путь к директории с файлами.
         patient_id (int): Номер пациента.
         record_id (int): Номер исследования.
-        system (str): Операционная система (win или другой).
+        picks (list): Каналы полиграммы для загрузки (None - все каналы).
+        tmin (float): Начало загружаемого фрагмента в секундах.
+        tmax (float): Конец загружаемого фрагмента в секундах.
 
         Returns:
-        dict: Данные исследования для указанного пациента.
+        RecordStore: Данные исследования для указанного пациента.
         """
         if self.dir_path is None:
             raise ValueError("The directory path is not set.")
@@ -207,30 +387,47 @@ class DataProcessor:
 
         dirpath = os.path.join(self.dir_path, f"Np {patient_id}", f"Nr {record_id}")
 
-        os.chdir(dirpath)
+        result = RecordStore()
 
-        result = []
-        pre_result = {}
-
-        for file in os.listdir(dirpath):
-            if file == ".DS_Store":
+        for file in sorted(os.listdir(dirpath)):
+            role = EdfFile.file_role(file)
+            if role is None:
                 continue
-            else:
-                new_file = self.fix_file(dirpath, file)
 
-                pre_result["patient"] = patient_id
-                pre_result["record"] = record_id
+            pre_result = result.add(patient_id, record_id)
 
-                if new_file.endswith("poly.EDF"):
-                    pre_result["poly"] = self.load_raw_file(dirpath, new_file)
-                elif new_file.endswith("hypno.EDF"):
-                    pre_result["hypno"] = self.load_raw_file(dirpath, new_file)
+            with self.timings.span("load"):
+                if role == "poly":
+                    pre_result.poly = self.load_raw_file(
+                        dirpath, file, picks=picks, tmin=tmin, tmax=tmax
+                    )
+                else:
+                    pre_result.hypno = self.load_raw_file(
+                        dirpath, file, tmin=tmin, tmax=tmax
+                    )
 
-        if len(pre_result):
-            result.append(pre_result)
-            return result
-        else:
-            return []
+        return result
+
+    def build_pyramid(
+        self, patient_id: int, record_id: int, out_dir: str, raw_data=None
+    ) -> SignalPyramid:
+        """
+        Строит (или открывает уже построенную) min/max-пирамиду полиграммы
+        для просмотрщика после загрузки исследования.
+
+        Parameters:
+        patient_id (int): Номер пациента.
+        record_id (int): Номер исследования.
+        out_dir (str): Директория для сохранения пирамиды.
+        raw_data (RecordStore): Результат fix_load_specific (None - загрузить).
+
+        Returns:
+        SignalPyramid: Открытая пирамида.
+        """
+        if raw_data is None:
+            raw_data = self.fix_load_specific(patient_id, record_id)
+        poly = self.get_recording(raw_data, patient_id, record_id, "poly")
+        return SignalPyramid.open_or_build(poly, out_dir)
 
     # ФИКСИТ ТОЛЬКО ФАЙЛЫ ВЫБРАННОГО ПАЦИЕНТА И ИССЛЕДОВАНИЯ
     def fix_specific(self, patient_id: int, record_id: int):
@@ -269,3 +466,42 @@ class DataProcessor:
                 if file == ".DS_Store":
                     continue
                 DataProcessor.fix_file(dirpath, file)
+
+
+def _load_failed(key, error, errors):
+    """
+    Сохраняет ошибку загрузки исследования key в errors или выводит предупреждение.
+    """
+    if errors is not None:
+        errors[key] = "".join(traceback.format_exception(error))
+    else:
+        patient_id, record_id = key
+        warnings.warn(f"Np {patient_id}/Nr {record_id}: {type(error).__name__}: {error}")
+
+
+def _fix_load_record(
+    dir_path: str,
+    system: str,
+    cache: SignalCache,
+    patient_id: int,
+    record_id: int,
+    load_kwargs: dict,
+):
+    """
+    Исправляет и загружает одно исследование в процессе-обработчике.
+
+    Parameters:
+    dir_path (str): Путь к директории с данными.
+    system (str): Операционная система (win или другой).
+    cache (SignalCache): Кэш декодированных записей.
+    patient_id (int): Номер пациента.
+    record_id (int): Номер исследования.
+    load_kwargs (dict): Параметры выборочной загрузки.
+
+    Returns:
+    Record: Запись исследования или None.
+    """
+    dp = DataProcessor(dir_path, system, cache)
+    return dp.fix_load_specific(patient_id, record_id, **load_kwargs).get(
+        patient_id, record_id
+    )
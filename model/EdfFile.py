@@ -0,0 +1,177 @@
+import io
+import os
+
+import mne
+from mne.io.edf.edf import RawEDF
+
+# Расширения файлов гипнограмм
+HYPNO_EXTENSIONS = (
+    "cm1",
+    "cp1",
+    "ch3",
+    "cc1",
+    "cn1",
+    "cc3",
+    "cu4",
+    "cn4",
+    "cn3",
+    "cc2",
+    "cs1",
+)
+# Поле версии в начале заголовка EDF
+EDF_VERSION = b"0       "
+# Размер фиксированной части заголовка EDF
+HEADER_SIZE = 256
+# Часть заголовка, в которой ":" заменяется на "." (как в fix_file)
+PATCH_SIZE = 200
+
+
+class EdfFile:
+    def __init__(self, path: str):
+        """
+        Файл исследования в формате EDF, открываемый только для чтения.
+
+        Роль файла (полиграмма или гипнограмма) определяется по расширению,
+        формат - по заголовку. Если в заголовке дата и время записаны через
+        ":" (файлы REC), исправленный заголовок подставляется в памяти поверх
+        исходного файла, сам файл не изменяется и не переименовывается.
+
+        Parameters:
+        path (str): Путь к файлу.
+        """
+        self.path = path
+        self.role = self.file_role(os.path.basename(path))
+        self.header = b""
+        self.patch = None
+        if self.role is not None:
+            with open(path, "rb") as f:
+                self.header = f.read(HEADER_SIZE)
+            head = self.header[:PATCH_SIZE]
+            if self.is_edf and b":" in head:
+                self.patch = head.replace(b":", b".")
+
+    @staticmethod
+    def file_role(file: str):
+        """
+        Роль файла по имени.
+
+        Parameters:
+        file (str): Имя файла.
+
+        Returns:
+        str: poly, hypno или None для посторонних файлов.
+        """
+        name, _, extension = file.rpartition(".")
+        if not name:
+            return None
+        extension = extension.lower()
+        if extension == "rec":
+            return "poly"
+        if extension in HYPNO_EXTENSIONS:
+            return "hypno"
+        if extension == "edf" and name.endswith("_poly"):
+            return "poly"
+        if extension == "edf" and name.endswith("_hypno"):
+            return "hypno"
+        return None
+
+    @property
+    def is_edf(self) -> bool:
+        return self.header[:8] == EDF_VERSION
+
+    def open(self):
+        """
+        Открывает файл для чтения с исправленным заголовком.
+
+        Returns:
+        io.BufferedReader: Файловый объект.
+        """
+        return _OverlayReader(self.path, self.patch or b"")
+
+    def read_raw(self, preload: bool = True, verbose: int = 0):
+        """
+        Читает файл через MNE.
+
+        Файл с расширением .edf без исправлений передаётся по пути. Остальные
+        файлы (REC, гипнограммы, файлы с исправленным заголовком) передаются
+        файловым объектом с исправленным заголовком; без предзагрузки MNE
+        читает из него только запрошенные каналы и фрагменты, поэтому объект
+        остаётся открытым, пока используется возвращённая запись.
+
+        Parameters:
+        preload (bool): Загрузить ли данные в память.
+        verbose (int): Уровень детализации сообщений.
+
+        Returns:
+        mne.io.Raw: Загруженный файл.
+        """
+        if not self.is_edf:
+            raise ValueError(f"Not an EDF file: {self.path}")
+        if self.patch is None and self.path.lower().endswith(".edf"):
+            return mne.io.read_raw_edf(self.path, preload=preload, verbose=verbose)
+        if preload:
+            with self.open() as f:
+                return mne.io.read_raw_edf(f, preload=True, verbose=verbose)
+        # read_raw_edf не принимает файловые объекты без предзагрузки, хотя
+        # RawEDF читает данные из такого объекта по требованию
+        return RawEDF(self.open(), preload=False, verbose=verbose)
+
+
+class _OverlayReader(io.BufferedReader):
+    def __init__(self, path: str, overlay: bytes):
+        """
+        Буферизованное чтение _OverlayFile. MNE хранит файловый объект в
+        записи, поэтому при копировании и сериализации записи файл
+        открывается заново.
+        """
+        super().__init__(_OverlayFile(path, overlay))
+        self._args = (path, overlay)
+
+    def __reduce__(self):
+        return type(self), self._args
+
+
+class _OverlayFile(io.RawIOBase):
+    def __init__(self, path: str, overlay: bytes):
+        """
+        Файл только для чтения, первые len(overlay) байт которого берутся из overlay.
+        """
+        self._file = open(path, "rb")
+        self._overlay = overlay
+        self._pos = 0
+        self.name = path
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += os.fstat(self._file.fileno()).st_size
+        self._pos = max(offset, 0)
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+    def readinto(self, buffer):
+        view = memoryview(buffer).cast("B")
+        n = 0
+        if self._pos < len(self._overlay):
+            chunk = self._overlay[self._pos : self._pos + len(view)]
+            view[: len(chunk)] = chunk
+            n = len(chunk)
+        if n < len(view):
+            self._file.seek(self._pos + n)
+            n += self._file.readinto(view[n:])
+        self._pos += n
+        return n
+
+    def close(self):
+        if not self.closed:
+            self._file.close()
+        super().close()
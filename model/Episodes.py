@@ -0,0 +1,215 @@
+import numpy as np
+import pandas as pd
+
+
+class EpisodeTable:
+    # Типы эпизодов: код - положение в кортеже
+    kinds = ("apnoe", "hypapnoe")
+    # Названия типов в отчёте
+    names = {"apnoe": "апноэ", "hypapnoe": "гипопноэ"}
+
+    def __init__(self, start, end, kind, sfreq: float = 200):
+        """
+        Таблица эпизодов нарушения дыхания в виде массивов, упорядоченных
+        по началу эпизода.
+
+        Parameters:
+        start (np.ndarray): Первый отсчёт эпизода.
+        end (np.ndarray): Последний отсчёт эпизода (включительно).
+        kind (np.ndarray): Код типа (индекс в EpisodeTable.kinds).
+        sfreq (float): Частота дискретизации.
+        """
+        start = np.asarray(start, dtype=np.int64)
+        order = np.argsort(start, kind="stable")
+        self.start = start[order]
+        self.end = np.asarray(end, dtype=np.int64)[order]
+        self.kind = np.asarray(kind, dtype=np.int8)[order]
+        self.sfreq = sfreq
+
+    @classmethod
+    def from_windows(cls, positions, is_apnoe, is_hypapnoe, half_window, sfreq=200):
+        """
+        Собирает эпизоды из отмеченных окон, объединяя подряд идущие окна в
+        интервалы: серия отмеченных окон закрывается первым неотмеченным окном
+        и становится эпизодом апноэ (от первого до последнего окна апноэ), если
+        в ней есть окно апноэ, иначе эпизодом гипопноэ. Незакрытая серия в
+        конце отбрасывается.
+
+        Parameters:
+        positions (np.ndarray): Центры окон.
+        is_apnoe (np.ndarray): Маска окон апноэ.
+        is_hypapnoe (np.ndarray): Маска окон гипопноэ.
+        half_window (int): Половина маленького окна.
+        sfreq (float): Частота дискретизации.
+
+        Returns:
+        EpisodeTable: Таблица эпизодов.
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        is_other = ~(is_apnoe | is_hypapnoe)
+        run_id = np.cumsum(is_other) - is_other
+        closed = run_id < int(is_other.sum())
+
+        starts, ends, kinds = [], [], []
+        apnoe_runs = None
+        for code, mask in enumerate((is_apnoe, is_hypapnoe)):
+            idx = np.flatnonzero(mask & closed)
+            runs = run_id[idx]
+            if code == 0:
+                apnoe_runs = runs
+            else:
+                keep = ~np.isin(runs, apnoe_runs)
+                idx, runs = idx[keep], runs[keep]
+            first = np.flatnonzero(np.r_[True, runs[1:] != runs[:-1]]) if len(idx) else idx
+            last = np.r_[first[1:] - 1, len(idx) - 1] if len(idx) else idx
+            starts.append(positions[idx[first]] - half_window)
+            ends.append(positions[idx[last]] + half_window - 1)
+            kinds.append(np.full(len(first), code))
+        return cls(np.concatenate(starts), np.concatenate(ends), np.concatenate(kinds), sfreq)
+
+    @classmethod
+    def from_dict(cls, episode_s_e: dict, sfreq: float = 200):
+        """
+        Таблица из словаря {"apnoe": [(начало, конец), ...], "hypapnoe": [...]}.
+        """
+        rows = [
+            (start, end, code)
+            for code, kind in enumerate(cls.kinds)
+            for start, end in episode_s_e.get(kind, [])
+        ]
+        start, end, kind = (np.array(column) for column in zip(*rows)) if rows else ([], [], [])
+        return cls(start, end, kind, sfreq)
+
+    def to_dict(self) -> dict:
+        """
+        Словарь эпизодов в формате mark_episodes.
+        """
+        return {
+            kind: list(zip(self.start[mask].tolist(), self.end[mask].tolist()))
+            for kind, mask in ((kind, self.kind == code) for code, kind in enumerate(self.kinds))
+        }
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    @property
+    def start_time(self) -> np.ndarray:
+        return self.start / self.sfreq
+
+    @property
+    def end_time(self) -> np.ndarray:
+        return (self.end + 1) / self.sfreq
+
+    @property
+    def duration(self) -> np.ndarray:
+        return self.end_time - self.start_time
+
+    def type_names(self) -> np.ndarray:
+        return np.array([self.names[kind] for kind in self.kinds])[self.kind]
+
+    def take(self, idx):
+        """
+        Подтаблица по индексам или срезу.
+        """
+        return EpisodeTable(self.start[idx], self.end[idx], self.kind[idx], self.sfreq)
+
+    def to_df(self) -> pd.DataFrame:
+        """
+        Таблица для отчёта со столбцами number, start_time, end_time, duration, type.
+        """
+        return pd.DataFrame(
+            {
+                "number": np.arange(1, len(self) + 1),
+                "start_time": self.start_time,
+                "end_time": self.end_time,
+                "duration": self.duration,
+                "type": self.type_names(),
+            }
+        )
+
+
+class EpisodeIndex:
+    def __init__(self, table: EpisodeTable, hypno=None, hypno_sfreq: float = None):
+        """
+        Индекс эпизодов для запросов по времени и стадиям сна.
+
+        Эпизоды не пересекаются, поэтому при упорядочении по началу концы тоже
+        упорядочены, и эпизоды, пересекающие отрезок, находятся двумя
+        бинарными поисками. Для каждой стадии хранится своя упорядоченная
+        подтаблица.
+
+        Parameters:
+        table (EpisodeTable): Таблица эпизодов.
+        hypno (np.ndarray): Стадии сна по отсчётам гипнограммы (None - без стадий).
+        hypno_sfreq (float): Частота дискретизации гипнограммы.
+        """
+        self.table = table
+        self.stage = None
+        self._start_time = table.start_time
+        self._end_time = table.end_time
+        self._by_stage = {}
+        if hypno is not None:
+            hypno = np.asarray(hypno)
+            idx = np.floor(self._start_time * hypno_sfreq).astype(np.int64)
+            self.stage = hypno[np.clip(idx, 0, len(hypno) - 1)] if len(hypno) else idx
+            for stage in np.unique(self.stage):
+                stage_idx = np.flatnonzero(self.stage == stage)
+                self._by_stage[stage.item()] = (
+                    stage_idx,
+                    self._start_time[stage_idx],
+                    self._end_time[stage_idx],
+                )
+
+    def overlapping(self, t0: float, t1: float, stage=None) -> EpisodeTable:
+        """
+        Эпизоды, пересекающие отрезок [t0, t1].
+
+        Parameters:
+        t0 (float): Начало отрезка, секунды.
+        t1 (float): Конец отрезка, секунды.
+        stage: Стадия сна (None - все стадии).
+
+        Returns:
+        EpisodeTable: Подтаблица эпизодов.
+        """
+        if stage is None:
+            i0, i1 = _overlap_bounds(self._start_time, self._end_time, t0, t1)
+            return self.table.take(slice(i0, i1))
+        if self.stage is None:
+            raise ValueError("The index was built without a hypnogram.")
+        if stage not in self._by_stage:
+            return self.table.take(slice(0, 0))
+        idx, start_time, end_time = self._by_stage[stage]
+        i0, i1 = _overlap_bounds(start_time, end_time, t0, t1)
+        return self.table.take(idx[i0:i1])
+
+    def count(self, t0: float, t1: float, stage=None) -> int:
+        """
+        Количество эпизодов, пересекающих отрезок [t0, t1].
+        """
+        if stage is None:
+            start_time, end_time = self._start_time, self._end_time
+        elif self.stage is None:
+            raise ValueError("The index was built without a hypnogram.")
+        elif stage not in self._by_stage:
+            return 0
+        else:
+            _, start_time, end_time = self._by_stage[stage]
+        i0, i1 = _overlap_bounds(start_time, end_time, t0, t1)
+        return i1 - i0
+
+    def stage_counts(self) -> dict:
+        """
+        Количество эпизодов по стадиям сна (стадия в начале эпизода).
+        """
+        return {stage: len(idx) for stage, (idx, _, _) in self._by_stage.items()}
+
+
+def _overlap_bounds(start_time, end_time, t0, t1):
+    """
+    Диапазон [i0, i1) упорядоченных непересекающихся интервалов
+    [start_time, end_time), пересекающих отрезок [t0, t1].
+    """
+    i0 = int(np.searchsorted(end_time, t0, side="right"))
+    i1 = int(np.searchsorted(start_time, t1, side="right"))
+    return i0, max(i0, i1)
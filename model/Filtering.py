@@ -0,0 +1,136 @@
+import numpy as np
+from scipy import signal
+
+from .Spectral import EEG_CHANNELS
+
+# Фильтры каналов по умолчанию: канал -> (тип фильтра Баттерворта, частота среза, Гц)
+FILTERS = {
+    "Airflow": ("bandpass", (0.05, 2.0)),
+    "Chest": ("bandpass", (0.05, 2.0)),
+    "Abdomen": ("bandpass", (0.05, 2.0)),
+    "SaO2": ("lowpass", 1.0),
+    **{channel: ("bandpass", (0.3, 35.0)) for channel in EEG_CHANNELS},
+}
+
+
+def design_sos(btype: str, cutoff, sfreq: float, order: int = 2) -> np.ndarray:
+    """
+    Фильтр Баттерворта в виде последовательности секций второго порядка.
+
+    Parameters:
+    btype (str): Тип фильтра (lowpass, highpass, bandpass, bandstop).
+    cutoff: Частота среза или пара частот, Гц.
+    sfreq (float): Частота дискретизации.
+    order (int): Порядок фильтра.
+
+    Returns:
+    np.ndarray: Коэффициенты секций (секции x 6).
+    """
+    return signal.butter(order, cutoff, btype=btype, fs=sfreq, output="sos")
+
+
+class ChunkedFilter:
+    def __init__(self, sos, n_channels: int):
+        """
+        Фильтрация нескольких каналов одним фильтром по порциям с сохранением
+        состояния фильтра между порциями: результат совпадает с фильтрацией
+        всего сигнала scipy.signal.sosfilt с начальным состоянием по первому
+        отсчёту, а память не зависит от длины записи.
+
+        Parameters:
+        sos (np.ndarray): Коэффициенты секций второго порядка.
+        n_channels (int): Количество каналов.
+        """
+        self.sos = np.asarray(sos, dtype=np.float64)
+        self.n_channels = n_channels
+        self.zi = None
+
+    def reset(self):
+        self.zi = None
+
+    def process(self, chunk) -> np.ndarray:
+        """
+        Фильтрует очередную порцию сигналов.
+
+        Parameters:
+        chunk (np.ndarray): Массив (каналы x отсчёты).
+
+        Returns:
+        np.ndarray: Отфильтрованная порция (float64).
+        """
+        chunk = np.asarray(chunk, dtype=np.float64)
+        if chunk.ndim != 2 or chunk.shape[0] != self.n_channels:
+            raise ValueError("Chunk must be a (channels x samples) array.")
+        if not chunk.shape[1]:
+            return chunk
+        if self.zi is None:
+            # Установившееся состояние для первого отсчёта, как в sosfiltfilt
+            self.zi = signal.sosfilt_zi(self.sos)[:, None, :] * chunk[None, :, :1]
+        result, self.zi = signal.sosfilt(self.sos, chunk, axis=-1, zi=self.zi)
+        return result
+
+
+def filter_channels(data, rows, sos, chunk_size: int, zero_phase: bool = True):
+    """
+    Фильтрует строки массива на месте по порциям.
+
+    Прямой проход идёт от начала записи, обратный (для нулевого фазового
+    сдвига, как в scipy.signal.sosfiltfilt без дополнения краёв) - от конца;
+    оба пишут результат в тот же массив, поэтому дополнительно нужна память
+    только на одну порцию.
+
+    Parameters:
+    data (np.ndarray): Массив (каналы x отсчёты), изменяется на месте.
+    rows (list): Индексы фильтруемых каналов.
+    sos (np.ndarray): Коэффициенты секций второго порядка.
+    chunk_size (int): Длина порции, отсчёты.
+    zero_phase (bool): Фильтровать в обе стороны.
+    """
+    n_samples = data.shape[1]
+    starts = range(0, n_samples, chunk_size)
+    chunked = ChunkedFilter(sos, len(rows))
+    for start in starts:
+        part = slice(start, start + chunk_size)
+        data[rows, part] = chunked.process(data[rows, part])
+    if not zero_phase:
+        return
+    chunked.reset()
+    for start in reversed(starts):
+        part = slice(start, start + chunk_size)
+        data[rows, part] = chunked.process(data[rows, part][:, ::-1])[:, ::-1]
+
+
+def filter_recording(
+    recording,
+    filters: dict = FILTERS,
+    order: int = 2,
+    chunk_seconds: float = 60.0,
+    zero_phase: bool = True,
+):
+    """
+    Фильтрует каналы записи на месте.
+
+    Каналы с одинаковым фильтром обрабатываются вместе одним вызовом
+    sosfilt на порцию. Каналы, которых нет в filters, не изменяются.
+
+    Parameters:
+    recording (Recording): Запись, изменяется на месте.
+    filters (dict): Канал -> (тип фильтра, частота среза), как в FILTERS.
+    order (int): Порядок фильтров Баттерворта.
+    chunk_seconds (float): Длина порции, секунды.
+    zero_phase (bool): Фильтровать в обе стороны (без фазового сдвига).
+
+    Returns:
+    Recording: Та же запись.
+    """
+    groups = {}
+    for channel, (btype, cutoff) in filters.items():
+        if channel in recording:
+            key = (btype, tuple(np.atleast_1d(cutoff).tolist()))
+            groups.setdefault(key, []).append(recording.ch_names.index(channel))
+
+    chunk_size = max(int(chunk_seconds * recording.sfreq), 1)
+    for (btype, cutoff), rows in groups.items():
+        sos = design_sos(btype, cutoff if len(cutoff) > 1 else cutoff[0], recording.sfreq, order)
+        filter_channels(recording.data, rows, sos, chunk_size, zero_phase)
+    return recording
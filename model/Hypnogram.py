@@ -0,0 +1,190 @@
+import numpy as np
+
+# Стадия бодрствования в гипнограмме
+WAKE = 0
+
+
+class Hypnogram:
+    def __init__(self, stages, epoch: float = 30.0, start: float = 0.0):
+        """
+        Гипнограмма по эпохам.
+
+        Parameters:
+        stages (np.ndarray): Стадия сна для каждой эпохи (0 - бодрствование).
+        epoch (float): Длительность эпохи, секунды.
+        start (float): Время начала первой эпохи, секунды.
+        """
+        self.stages = np.asarray(stages)
+        self.epoch = epoch
+        self.start = start
+        self.epoch_starts = start + np.arange(len(self.stages)) * epoch
+
+    @classmethod
+    def from_samples(cls, values, sfreq: float, epoch: float = 30.0):
+        """
+        Гипнограмма из стадий, записанных с частотой sfreq (берётся значение
+        в начале каждой эпохи).
+
+        Parameters:
+        values (np.ndarray): Стадии по отсчётам.
+        sfreq (float): Частота дискретизации гипнограммы.
+        epoch (float): Длительность эпохи, секунды.
+
+        Returns:
+        Hypnogram: Гипнограмма.
+        """
+        values = np.asarray(values)
+        n_epochs = int(np.ceil(len(values) / (epoch * sfreq)))
+        idx = np.minimum((np.arange(n_epochs) * epoch * sfreq).astype(np.int64), len(values) - 1)
+        return cls(values[idx], epoch)
+
+    @property
+    def end(self) -> float:
+        return self.start + len(self.stages) * self.epoch
+
+    def epoch_of(self, times) -> np.ndarray:
+        """
+        Номера эпох для моментов времени (-1 - до начала гипнограммы).
+
+        Parameters:
+        times (np.ndarray): Время, секунды.
+
+        Returns:
+        np.ndarray: Номера эпох.
+        """
+        return np.searchsorted(self.epoch_starts, times, side="right") - 1
+
+    def stage_at(self, times) -> np.ndarray:
+        """
+        Стадии сна в моменты времени (за пределами гипнограммы - крайние эпохи).
+        """
+        idx = np.clip(self.epoch_of(times), 0, len(self.stages) - 1)
+        return self.stages[idx]
+
+    def epoch_samples(self, sfreq: float) -> np.ndarray:
+        """
+        Индексы отсчётов сигнала с частотой sfreq, с которых начинаются эпохи.
+        """
+        return np.round(self.epoch_starts * sfreq).astype(np.int64)
+
+    def to_samples(self, sfreq: float, n_samples: int) -> np.ndarray:
+        """
+        Стадии для каждого отсчёта сигнала с частотой sfreq.
+
+        Parameters:
+        sfreq (float): Частота дискретизации сигнала.
+        n_samples (int): Количество отсчётов.
+
+        Returns:
+        np.ndarray: Стадии по отсчётам.
+        """
+        idx = np.searchsorted(self.epoch_samples(sfreq), np.arange(n_samples), side="right") - 1
+        return self.stages[np.clip(idx, 0, len(self.stages) - 1)]
+
+    def sleep_bounds(self):
+        """
+        Засыпание и пробуждение: начало первой и конец последней эпохи сна.
+
+        Returns:
+        tuple: Время засыпания и пробуждения, секунды (None, None без эпох сна).
+        """
+        sleep = np.flatnonzero(self.stages != WAKE)
+        if not len(sleep):
+            return None, None
+        return float(self.epoch_starts[sleep[0]]), float(self.epoch_starts[sleep[-1]] + self.epoch)
+
+    def wake_spans(self) -> np.ndarray:
+        """
+        Периоды бодрствования внутри ночи (между засыпанием и пробуждением).
+
+        Returns:
+        np.ndarray: Массив (периоды x 2) начал и концов, секунды.
+        """
+        sleep = np.flatnonzero(self.stages != WAKE)
+        if not len(sleep):
+            return np.empty((0, 2))
+        wake = np.r_[False, self.stages[sleep[0] : sleep[-1] + 1] == WAKE, False].astype(np.int8)
+        edges = np.diff(wake)
+        first = np.flatnonzero(edges == 1) + sleep[0]
+        last = np.flatnonzero(edges == -1) + sleep[0]
+        return np.stack([self.epoch_starts[first], self.epoch_starts[last]], axis=1)
+
+    def summary(self, episodes) -> dict:
+        """
+        Индекс апноэ-гипопноэ (ИАГ) и количество эпизодов по стадиям сна и
+        третям ночи (от засыпания до пробуждения) за один проход.
+
+        Parameters:
+        episodes (EpisodeTable): Эпизоды.
+
+        Returns:
+        dict: Общее время сна, ИАГ, сводка по стадиям и третям, периоды бодрствования.
+        """
+        onset, offset = self.sleep_bounds()
+        stages, stage_epochs = np.unique(self.stages, return_counts=True)
+        start_time = episodes.start_time
+
+        stage_idx = np.searchsorted(stages, self.stage_at(start_time))
+        stage_counts = np.bincount(stage_idx, minlength=len(stages))
+
+        thirds = np.zeros(3, dtype=np.int64)
+        if onset is not None:
+            inside = (start_time >= onset) & (start_time < offset)
+            third = ((start_time[inside] - onset) * 3 // (offset - onset)).astype(np.int64)
+            thirds = np.bincount(third, minlength=3)
+
+        sleep_hours = stage_epochs[stages != WAKE].sum() * self.epoch / 3600
+        sleep_episodes = stage_counts[stages != WAKE].sum()
+        per_stage = {}
+        for stage, epochs, count in zip(stages.tolist(), stage_epochs, stage_counts):
+            hours = epochs * self.epoch / 3600
+            per_stage[stage] = {
+                "count": int(count),
+                "minutes": hours * 60,
+                "ahi": count / hours if hours else 0.0,
+            }
+        return {
+            "sleep_onset": onset,
+            "sleep_offset": offset,
+            "total_sleep_time": sleep_hours * 3600,
+            "ahi": sleep_episodes / sleep_hours if sleep_hours else 0.0,
+            "stages": per_stage,
+            "thirds": thirds.tolist(),
+            "wake_spans": self.wake_spans().tolist(),
+        }
+
+
+def sleep_bounds(hyp):
+    """
+    Индексы первого отсчёта сна и отсчёта после последнего отсчёта сна
+    (то же, что Analyser.wake_coords).
+
+    Parameters:
+    hyp (np.ndarray): Стадии по отсчётам.
+
+    Returns:
+    tuple: Начало и конец сна.
+    """
+    hyp = np.asarray(hyp)
+    sleep = np.flatnonzero(hyp != WAKE)
+    if not len(sleep):
+        return 0, max(len(hyp) - 1, 0)
+    return int(sleep[0]), int(sleep[-1]) + 1
+
+
+def night_thirds(start_time, duration: float) -> np.ndarray:
+    """
+    Количество эпизодов в первой, второй и последней трети записи.
+
+    Parameters:
+    start_time (np.ndarray): Время начала эпизодов, секунды.
+    duration (float): Длительность записи, секунды.
+
+    Returns:
+    np.ndarray: Три количества.
+    """
+    start_time = np.asarray(start_time, dtype=np.float64)
+    if not duration:
+        return np.zeros(3, dtype=np.int64)
+    third = np.clip((start_time * 3 // duration).astype(np.int64), 0, 2)
+    return np.bincount(third, minlength=3)
@@ -0,0 +1,53 @@
+import threading
+
+import numpy as np
+
+from catboost import CatBoostRegressor
+
+
+class ModelRegistry:
+    # Загруженные модели по пути к файлу, общие для всех анализаторов процесса
+    _models = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, model_path: str) -> CatBoostRegressor:
+        """
+        Возвращает модель, загружая её с диска только при первом обращении.
+
+        :param model_path: Путь к предобученной модели.
+        :return: Загруженная модель.
+        """
+        with cls._lock:
+            model = cls._models.get(model_path)
+            if model is None:
+                model = CatBoostRegressor()
+                model.load_model(model_path)
+                cls._models[model_path] = model
+            return model
+
+    @classmethod
+    def clear(cls):
+        """
+        Выгружает все модели.
+        """
+        with cls._lock:
+            cls._models.clear()
+
+    @classmethod
+    def predict_batch(cls, model_path: str, matrices: list, thread_count: int = -1):
+        """
+        Предсказание для нескольких матриц признаков одним вызовом модели.
+
+        :param model_path: Путь к предобученной модели.
+        :param matrices: Список матриц признаков с одинаковым числом столбцов.
+        :param thread_count: Количество потоков CatBoost (-1 - все ядра).
+        :return: Список предсказаний для каждой матрицы.
+        """
+        if not matrices:
+            return []
+        model = cls.get(model_path)
+        sizes = [len(X) for X in matrices]
+        pred = model.predict(np.concatenate(matrices), thread_count=thread_count)
+        return np.split(pred, np.cumsum(sizes)[:-1])
+
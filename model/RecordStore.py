@@ -0,0 +1,99 @@
+class Record:
+    # Слоты под номер пациента, номер исследования и загруженные файлы
+    __slots__ = ("patient", "record", "poly", "hypno")
+
+    def __init__(self, patient: int, record: int, poly=None, hypno=None):
+        """
+        Запись одного исследования пациента.
+
+        Parameters:
+        patient (int): Номер пациента.
+        record (int): Номер исследования.
+        poly (mne.io.Raw): Полиграмма.
+        hypno (mne.io.Raw): Гипнограмма.
+        """
+        self.patient = patient
+        self.record = record
+        self.poly = poly
+        self.hypno = hypno
+
+    def __getitem__(self, key: str):
+        # Доступ по ключу, как к словарю из прежнего формата
+        if key not in self.__slots__:
+            raise KeyError(key)
+        value = getattr(self, key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.__slots__ and getattr(self, key) is not None
+
+    def get(self, key: str, default=None):
+        return self[key] if key in self else default
+
+    def __repr__(self) -> str:
+        return f"Record(patient={self.patient}, record={self.record})"
+
+
+class RecordStore:
+    def __init__(self, records=()):
+        """
+        Хранилище записей с доступом по ключу (patient, record).
+
+        Итерируется по записям в порядке добавления, как прежний список.
+
+        Parameters:
+        records (iterable): Записи (Record или словари прежнего формата).
+        """
+        self._records = {}
+        for item in records:
+            record = self.add(item["patient"], item["record"])
+            if "poly" in item:
+                record.poly = item["poly"]
+            if "hypno" in item:
+                record.hypno = item["hypno"]
+
+    def add(self, patient: int, record: int) -> Record:
+        """
+        Возвращает запись для пациента и исследования, создавая её при необходимости.
+
+        Parameters:
+        patient (int): Номер пациента.
+        record (int): Номер исследования.
+
+        Returns:
+        Record: Запись исследования.
+        """
+        key = (patient, record)
+        if key not in self._records:
+            self._records[key] = Record(patient, record)
+        return self._records[key]
+
+    def get(self, patient: int, record: int) -> Record:
+        """
+        Возвращает запись для пациента и исследования или None.
+
+        Parameters:
+        patient (int): Номер пациента.
+        record (int): Номер исследования.
+
+        Returns:
+        Record: Запись исследования.
+        """
+        return self._records.get((patient, record))
+
+    def __getitem__(self, key: tuple) -> Record:
+        return self._records[key]
+
+    def __contains__(self, key: tuple) -> bool:
+        return key in self._records
+
+    def __iter__(self):
+        return iter(self._records.values())
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __repr__(self) -> str:
+        return f"RecordStore({list(self._records)})"
@@ -0,0 +1,152 @@
+import numpy as np
+import pandas as pd
+
+
+class Recording:
+    def __init__(
+        self,
+        data,
+        ch_names: list,
+        sfreq: float,
+        start_time=None,
+        dtype=np.float32,
+    ):
+        """
+        Сигналы записи в одном непрерывном массиве (каналы x отсчёты).
+
+        Каналы отдаются как представления массива без копирования, DataFrame
+        строится по запросу поверх того же массива.
+
+        Parameters:
+        data (np.ndarray): Массив (каналы x отсчёты).
+        ch_names (list): Имена каналов.
+        sfreq (float): Частота дискретизации.
+        start_time (datetime): Время начала записи или None.
+        dtype: Тип хранимых значений (None - без преобразования).
+        """
+        data = np.asarray(data, dtype=dtype)
+        if data.ndim != 2 or data.shape[0] != len(ch_names):
+            raise ValueError("Data must be a (channels x samples) array.")
+        self.data = np.ascontiguousarray(data)
+        self.ch_names = list(ch_names)
+        self.sfreq = float(sfreq)
+        self.start_time = start_time
+        self._index = {name: i for i, name in enumerate(self.ch_names)}
+
+    @classmethod
+    def from_raw(cls, raw, picks: list = None, ch_names: list = None, dtype=np.float32):
+        """
+        Создаёт запись из mne.io.Raw, копируя каналы по одному сразу в
+        итоговый массив (без промежуточной копии всех каналов в float64).
+
+        Parameters:
+        raw (mne.io.Raw): Загруженная запись.
+        picks (list): Каналы (None - все каналы).
+        ch_names (list): Имена каналов в записи (None - как в raw).
+        dtype: Тип хранимых значений.
+
+        Returns:
+        Recording: Запись.
+        """
+        picks = list(raw.ch_names) if picks is None else list(picks)
+        data = np.empty((len(picks), raw.n_times), dtype=dtype)
+        for i, channel in enumerate(picks):
+            data[i] = raw.get_data(picks=[channel])[0]
+        return cls(
+            data,
+            picks if ch_names is None else ch_names,
+            raw.info["sfreq"],
+            raw.info.get("meas_date"),
+            dtype=None,
+        )
+
+    @property
+    def n_channels(self) -> int:
+        return self.data.shape[0]
+
+    @property
+    def n_samples(self) -> int:
+        return self.data.shape[1]
+
+    @property
+    def duration(self) -> float:
+        return self.n_samples / self.sfreq
+
+    @property
+    def times(self) -> np.ndarray:
+        """
+        Время отсчётов от начала записи, секунды.
+        """
+        return np.arange(self.n_samples) / self.sfreq
+
+    @property
+    def columns(self) -> list:
+        return self.ch_names
+
+    def __len__(self) -> int:
+        return self.n_samples
+
+    def __contains__(self, channel: str) -> bool:
+        return channel in self._index
+
+    def __getitem__(self, channel: str) -> np.ndarray:
+        """
+        Значения канала (представление без копирования).
+        """
+        return self.data[self._index[channel]]
+
+    def channels(self, names: list) -> np.ndarray:
+        """
+        Значения нескольких каналов (каналы x отсчёты).
+
+        Parameters:
+        names (list): Имена каналов.
+
+        Returns:
+        np.ndarray: Массив; для подряд идущих каналов - представление без копирования.
+        """
+        idx = [self._index[name] for name in names]
+        if idx and idx == list(range(idx[0], idx[0] + len(idx))):
+            return self.data[idx[0] : idx[0] + len(idx)]
+        return self.data[idx]
+
+    def crop(self, tmin: float = 0.0, tmax: float = None):
+        """
+        Фрагмент записи (представление без копирования).
+
+        Parameters:
+        tmin (float): Начало фрагмента, секунды.
+        tmax (float): Конец фрагмента, секунды (None - до конца записи).
+
+        Returns:
+        Recording: Фрагмент.
+        """
+        start = int(round(tmin * self.sfreq))
+        stop = self.n_samples if tmax is None else int(round(tmax * self.sfreq))
+        return Recording(
+            self.data[:, start:stop], self.ch_names, self.sfreq, self.start_time, dtype=None
+        )
+
+    def to_df(self, columns: list = None, time_column: str = None) -> pd.DataFrame:
+        """
+        DataFrame с каналами в столбцах поверх массива записи без копирования.
+
+        Parameters:
+        columns (list): Каналы (None - все каналы).
+        time_column (str): Имя столбца времени в секундах, добавляемого первым
+            (None - без столбца времени).
+
+        Returns:
+        pd.DataFrame: DataFrame (отсчёты x каналы).
+        """
+        columns = self.ch_names if columns is None else list(columns)
+        df = pd.DataFrame(self.channels(columns).T, columns=columns, copy=False)
+        if time_column is not None:
+            df.insert(0, time_column, self.times)
+        return df
+
+    def __repr__(self) -> str:
+        return (
+            f"Recording(channels={self.n_channels}, samples={self.n_samples}, "
+            f"sfreq={self.sfreq}, dtype={self.data.dtype})"
+        )
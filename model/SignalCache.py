@@ -0,0 +1,168 @@
+import hashlib
+import json
+import os
+import shutil
+
+import mne
+import numpy as np
+
+
+class SignalCache:
+    # Размер блока чтения при вычислении хэша файла
+    hash_chunk_size = 1 << 20
+
+    def __init__(self, cache_dir: str, max_bytes: int = 10 * 1024**3):
+        """
+        Дисковый кэш декодированных записей: каждый канал хранится отдельным
+        файлом .npy, запись адресуется хэшем содержимого исходного EDF.
+
+        Parameters:
+        cache_dir (str): Директория кэша.
+        max_bytes (int): Максимальный размер кэша в байтах; при превышении
+            удаляются записи, к которым дольше всего не обращались.
+        """
+        if not isinstance(cache_dir, str):
+            raise ValueError("The cache path must be a string.")
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._hashes = {}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def file_key(self, path: str) -> str:
+        """
+        Возвращает хэш содержимого файла.
+
+        Хэш запоминается по (путь, размер, время изменения), чтобы не читать
+        один и тот же файл повторно в пределах процесса.
+
+        Parameters:
+        path (str): Путь к файлу.
+
+        Returns:
+        str: Шестнадцатеричный хэш.
+        """
+        stat = os.stat(path)
+        stamp = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        if stamp not in self._hashes:
+            digest = hashlib.blake2b(digest_size=20)
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(self.hash_chunk_size), b""):
+                    digest.update(chunk)
+            self._hashes[stamp] = digest.hexdigest()
+        return self._hashes[stamp]
+
+    def load(self, path: str, picks: list = None, tmin: float = 0.0, tmax: float = None):
+        """
+        Загружает запись из кэша.
+
+        Каналы читаются через отображение в память, так что с диска
+        считывается только запрошенный фрагмент выбранных каналов. Если
+        какого-либо из запрошенных каналов в кэше нет, это считается
+        промахом, и запись читается из исходного файла.
+
+        Parameters:
+        path (str): Путь к исходному файлу EDF.
+        picks (list): Список каналов (None - все каналы).
+        tmin (float): Начало фрагмента в секундах.
+        tmax (float): Конец фрагмента в секундах (None - до конца записи).
+
+        Returns:
+        mne.io.RawArray: Запись или None, если её (или запрошенных каналов) нет в кэше.
+        """
+        entry = os.path.join(self.cache_dir, self.file_key(path))
+        meta_path = os.path.join(entry, "meta.json")
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if picks is not None and (
+            not picks or not set(picks).issubset(meta["ch_names"])
+        ):
+            return None
+        os.utime(meta_path)
+
+        sfreq = meta["sfreq"]
+        start = int(round(tmin * sfreq)) if tmin else 0
+        stop = None if tmax is None else int(round(tmax * sfreq)) + 1
+
+        indices = [
+            i
+            for i, name in enumerate(meta["ch_names"])
+            if picks is None or name in picks
+        ]
+        data = np.stack(
+            [
+                np.load(os.path.join(entry, f"ch_{i:03d}.npy"), mmap_mode="r")[
+                    start:stop
+                ]
+                for i in indices
+            ]
+        )
+        info = mne.create_info(
+            [meta["ch_names"][i] for i in indices],
+            sfreq,
+            [meta["ch_types"][i] for i in indices],
+            verbose=0,
+        )
+        raw = mne.io.RawArray(data, info, verbose=0)
+        if meta["meas_date"] is not None:
+            raw.set_meas_date(meta["meas_date"])
+        return raw
+
+    def store(self, path: str, raw) -> None:
+        """
+        Сохраняет полностью загруженную запись в кэш.
+
+        Parameters:
+        path (str): Путь к исходному файлу EDF.
+        raw (mne.io.Raw): Загруженная запись со всеми каналами.
+        """
+        key = self.file_key(path)
+        entry = os.path.join(self.cache_dir, key)
+        if os.path.exists(entry):
+            return
+
+        tmp_entry = f"{entry}.tmp-{os.getpid()}"
+        os.makedirs(tmp_entry, exist_ok=True)
+        for i, channel in enumerate(raw.get_data()):
+            np.save(os.path.join(tmp_entry, f"ch_{i:03d}.npy"), channel)
+        meas_date = raw.info["meas_date"]
+        meta = {
+            "ch_names": raw.ch_names,
+            "ch_types": raw.get_channel_types(),
+            "sfreq": raw.info["sfreq"],
+            "meas_date": None if meas_date is None else meas_date.timestamp(),
+        }
+        with open(os.path.join(tmp_entry, "meta.json"), "w") as f:
+            json.dump(meta, f)
+
+        try:
+            os.rename(tmp_entry, entry)
+        except OSError:
+            # Запись уже сохранена другим процессом
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+        self.evict()
+
+    def evict(self) -> None:
+        """
+        Удаляет записи, к которым дольше всего не обращались, пока размер
+        кэша превышает max_bytes.
+        """
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            entry = os.path.join(self.cache_dir, name)
+            meta_path = os.path.join(entry, "meta.json")
+            if not os.path.exists(meta_path):
+                continue
+            size = sum(
+                os.path.getsize(os.path.join(entry, file)) for file in os.listdir(entry)
+            )
+            entries.append((os.path.getmtime(meta_path), size, entry))
+            total += size
+
+        for _, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
@@ -0,0 +1,182 @@
+import json
+import os
+
+import numpy as np
+
+from .Recording import Recording
+
+
+class SignalPyramid:
+    # Имя файла с описанием пирамиды
+    meta_name = "meta.json"
+
+    def __init__(self, path: str):
+        """
+        Многоуровневая min/max-пирамида сигналов исследования на диске.
+
+        Уровень 0 - исходный сигнал, уровень k - пары (минимум, максимум)
+        по интервалам из buckets[k - 1] отсчётов.
+
+        Parameters:
+        path (str): Директория пирамиды, созданная SignalPyramid.build.
+        """
+        with open(os.path.join(path, self.meta_name)) as f:
+            meta = json.load(f)
+        self.path = path
+        self.channels = meta["channels"]
+        self.sfreq = meta["sfreq"]
+        self.n_samples = meta["n_samples"]
+        self.buckets = meta["buckets"]
+        self.duration = self.n_samples / self.sfreq
+        self._arrays = {}
+
+    @classmethod
+    def build(
+        cls,
+        raw,
+        path: str,
+        factor: int = 4,
+        epoch: float = 30.0,
+        dtype=np.float32,
+    ):
+        """
+        Строит пирамиду для всех каналов записи и сохраняет её на диск.
+
+        Уровни имеют размер интервала factor, factor ** 2, ... отсчётов,
+        последний уровень - одна пара (минимум, максимум) на эпоху.
+
+        Parameters:
+        raw (Recording | mne.io.Raw): Загруженная запись.
+        path (str): Директория для сохранения.
+        factor (int): Множитель размера интервала между уровнями.
+        epoch (float): Длительность эпохи самого грубого уровня, секунды.
+        dtype: Тип хранимых значений.
+
+        Returns:
+        SignalPyramid: Открытая пирамида.
+        """
+        if isinstance(raw, Recording):
+            sfreq, n_samples = raw.sfreq, raw.n_samples
+            channel_data = raw.__getitem__
+        else:
+            sfreq, n_samples = raw.info["sfreq"], raw.n_times
+            channel_data = lambda channel: raw.get_data(picks=[channel])[0]
+        epoch_size = int(round(epoch * sfreq))
+        buckets = []
+        size = factor
+        while size < epoch_size:
+            buckets.append(size)
+            size *= factor
+        buckets.append(epoch_size)
+
+        os.makedirs(path, exist_ok=True)
+        for i, channel in enumerate(raw.ch_names):
+            values = np.asarray(channel_data(channel), dtype=dtype)
+            np.save(os.path.join(path, f"{i:03d}_L0.npy"), values)
+            mins, maxs = values, values
+            previous = 1
+            for level, bucket in enumerate(buckets, 1):
+                # Уровни, кратные предыдущему, строятся из него, остальные из сигнала
+                if bucket % previous == 0:
+                    mins = _reduce_blocks(mins, bucket // previous, np.minimum)
+                    maxs = _reduce_blocks(maxs, bucket // previous, np.maximum)
+                else:
+                    mins = _reduce_blocks(values, bucket, np.minimum)
+                    maxs = _reduce_blocks(values, bucket, np.maximum)
+                previous = bucket
+                np.save(
+                    os.path.join(path, f"{i:03d}_L{level}.npy"),
+                    np.stack([mins, maxs], axis=1),
+                )
+
+        meta = {
+            "channels": list(raw.ch_names),
+            "sfreq": sfreq,
+            "n_samples": int(n_samples),
+            "buckets": buckets,
+        }
+        with open(os.path.join(path, cls.meta_name), "w") as f:
+            json.dump(meta, f)
+        return cls(path)
+
+    @classmethod
+    def open_or_build(cls, recording: Recording, path: str, **kwargs):
+        """
+        Открывает пирамиду записи, если она уже построена для тех же каналов
+        и длины, иначе строит её заново.
+
+        Parameters:
+        recording (Recording): Загруженная запись.
+        path (str): Директория пирамиды.
+        kwargs: Параметры SignalPyramid.build.
+
+        Returns:
+        SignalPyramid: Открытая пирамида.
+        """
+        if os.path.exists(os.path.join(path, cls.meta_name)):
+            pyramid = cls(path)
+            if (
+                pyramid.channels == list(recording.ch_names)
+                and pyramid.n_samples == recording.n_samples
+                and pyramid.sfreq == recording.sfreq
+            ):
+                return pyramid
+        return cls.build(recording, path, **kwargs)
+
+    def level(self, t0: float, t1: float, n_points: int) -> int:
+        """
+        Выбирает самый грубый уровень, дающий не меньше n_points точек на отрезке.
+
+        Parameters:
+        t0 (float): Начало отрезка, секунды.
+        t1 (float): Конец отрезка, секунды.
+        n_points (int): Требуемое число точек.
+
+        Returns:
+        int: Номер уровня (0 - исходный сигнал).
+        """
+        n = max(t1 - t0, 0) * self.sfreq
+        for level in range(len(self.buckets), 0, -1):
+            if 2 * n / self.buckets[level - 1] >= n_points:
+                return level
+        return 0
+
+    def window(self, channel: str, t0: float, t1: float, n_points: int):
+        """
+        Возвращает сигнал канала на отрезке с разрешением не ниже n_points точек.
+
+        Parameters:
+        channel (str): Имя канала.
+        t0 (float): Начало отрезка, секунды.
+        t1 (float): Конец отрезка, секунды.
+        n_points (int): Требуемое число точек.
+
+        Returns:
+        tuple: Время точек в секундах и значения.
+        """
+        level = self.level(t0, t1, n_points)
+        data = self._array(channel, level)
+        bucket = 1 if level == 0 else self.buckets[level - 1]
+        i0 = max(int(t0 * self.sfreq) // bucket, 0)
+        i1 = min(-(-int(np.ceil(t1 * self.sfreq) + 1) // bucket), len(data))
+        starts = np.arange(i0, i1) * bucket / self.sfreq
+        if level == 0:
+            return starts, np.asarray(data[i0:i1])
+        times = np.stack([starts, starts + bucket / self.sfreq / 2], axis=1)
+        return times.ravel(), np.asarray(data[i0:i1]).ravel()
+
+    def _array(self, channel: str, level: int):
+        key = (channel, level)
+        if key not in self._arrays:
+            i = self.channels.index(channel)
+            self._arrays[key] = np.load(
+                os.path.join(self.path, f"{i:03d}_L{level}.npy"), mmap_mode="r"
+            )
+        return self._arrays[key]
+
+
+def _reduce_blocks(values, size, ufunc):
+    """
+    Свёртка ufunc по последовательным блокам длины size (последний может быть короче).
+    """
+    return ufunc.reduceat(values, np.arange(0, len(values), size))
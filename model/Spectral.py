@@ -0,0 +1,116 @@
+import numpy as np
+import scipy.fft
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy import signal
+
+# Отведения ЭЭГ, как в нижней панели просмотрщика
+EEG_CHANNELS = ["Fp1-M2", "C3-M2", "O1-M2", "Fp2-M1", "C4-M1", "O2-M1"]
+# Частотные диапазоны ЭЭГ, Гц: [нижняя граница, верхняя граница)
+BANDS = {
+    "delta": (0.5, 4.0),
+    "theta": (4.0, 8.0),
+    "alpha": (8.0, 12.0),
+    "sigma": (12.0, 16.0),
+    "beta": (16.0, 30.0),
+}
+
+
+def epoch_view(data, sfreq: float, epoch: float = 30.0) -> np.ndarray:
+    """
+    Представление сигналов в виде эпох без копирования (неполная последняя
+    эпоха отбрасывается).
+
+    Parameters:
+    data (np.ndarray): Массив (каналы x отсчёты).
+    sfreq (float): Частота дискретизации.
+    epoch (float): Длительность эпохи, секунды.
+
+    Returns:
+    np.ndarray: Массив (каналы x эпохи x отсчёты эпохи).
+    """
+    data = np.asarray(data)
+    epoch_samples = int(round(epoch * sfreq))
+    n_epochs = data.shape[-1] // epoch_samples
+    return data[..., : n_epochs * epoch_samples].reshape(data.shape[:-1] + (n_epochs, epoch_samples))
+
+
+def band_matrix(freqs, bands: dict = BANDS) -> np.ndarray:
+    """
+    Матрица суммирования спектра по диапазонам (диапазоны x частоты).
+    """
+    return np.stack([(freqs >= low) & (freqs < high) for low, high in bands.values()]).astype(
+        np.float32
+    )
+
+
+def band_powers(
+    data,
+    sfreq: float,
+    epoch: float = 30.0,
+    bands: dict = BANDS,
+    segment: float = 4.0,
+    relative: bool = False,
+    chunk: int = 64,
+) -> np.ndarray:
+    """
+    Мощность сигналов в частотных диапазонах для каждой эпохи.
+
+    Спектральная плотность оценивается методом Уэлча (окно Ханна, сегменты
+    по segment секунд с перекрытием в половину, как scipy.signal.welch без
+    удаления тренда). Сегменты берутся представлением без копирования, и
+    одно вещественное БПФ считается сразу для всех каналов и chunk эпох;
+    спектр суммируется по диапазонам умножением на матрицу, так что полный
+    спектр всей записи в памяти не хранится.
+
+    Parameters:
+    data (np.ndarray): Массив (каналы x отсчёты).
+    sfreq (float): Частота дискретизации.
+    epoch (float): Длительность эпохи, секунды.
+    bands (dict): Диапазоны {название: (нижняя, верхняя граница)}, Гц.
+    segment (float): Длительность сегмента Уэлча, секунды.
+    relative (bool): Доля от суммарной мощности во всех диапазонах вместо
+        абсолютной мощности.
+    chunk (int): Количество эпох в одном вызове БПФ.
+
+    Returns:
+    np.ndarray: Массив float32 (каналы x эпохи x диапазоны).
+    """
+    epochs = epoch_view(np.asarray(data, dtype=np.float32), sfreq, epoch)
+    nperseg = min(int(round(segment * sfreq)), epochs.shape[-1])
+    step = max(nperseg - nperseg // 2, 1)
+    window = signal.get_window("hann", nperseg).astype(np.float32)
+    freqs = scipy.fft.rfftfreq(nperseg, 1 / sfreq)
+
+    # Односторонний спектр: все частоты, кроме нулевой и частоты Найквиста, удваиваются
+    weights = band_matrix(freqs, bands).T
+    weights[1 : len(freqs) - (nperseg % 2 == 0)] *= 2
+    weights *= (freqs[1] - freqs[0]) / (sfreq * np.sum(window**2))
+
+    powers = np.empty(epochs.shape[:2] + (len(bands),), dtype=np.float32)
+    for i in range(0, epochs.shape[1], chunk):
+        segments = sliding_window_view(epochs[:, i : i + chunk], nperseg, axis=-1)[..., ::step, :]
+        spectrum = scipy.fft.rfft(segments * window, axis=-1, workers=-1)
+        psd = (spectrum.real**2 + spectrum.imag**2).mean(axis=-2)
+        powers[:, i : i + chunk] = psd @ weights
+    if relative:
+        total = powers.sum(axis=-1, keepdims=True)
+        np.divide(powers, total, out=powers, where=total > 0)
+    return powers
+
+
+def eeg_band_powers(recording, channels: list = None, **kwargs):
+    """
+    Мощность в диапазонах ЭЭГ по эпохам для отведений записи.
+
+    Parameters:
+    recording (Recording): Запись полиграммы.
+    channels (list): Отведения (None - имеющиеся в записи из EEG_CHANNELS).
+    kwargs: Параметры band_powers.
+
+    Returns:
+    tuple: Список отведений и массив (отведения x эпохи x диапазоны).
+    """
+    if channels is None:
+        channels = [channel for channel in EEG_CHANNELS if channel in recording]
+    powers = band_powers(recording.channels(channels), recording.sfreq, **kwargs)
+    return channels, powers
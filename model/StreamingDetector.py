@@ -0,0 +1,144 @@
+import numpy as np
+
+from .Analyser import _classify_windows
+
+
+class StreamingDetector:
+    def __init__(
+        self,
+        big_window=60,
+        small_window=4,
+        num_parts=8,
+        sfreq=200,
+        start=0,
+        end=None,
+    ):
+        """
+        Потоковая разметка эпизодов апноэ и гипопноэ.
+
+        Принимает Airflow и SaO2 порциями произвольной длины и хранит только
+        историю, нужную для окон ещё не обработанных точек (около big_window
+        секунд), поэтому память не зависит от длины записи; при известном end
+        отсчёты, не нужные окнам до конца сна, не сохраняются. Окна и правила
+        те же, что в Analyser.mark_episodes: при тех же start и end потоковая
+        разметка совпадает с разметкой всей записи.
+
+        :param big_window: Размер большого окна оценки амплитуды.
+        :param small_window: Размер маленького окна оценки амплитуды.
+        :param num_parts: Количество кусочков большого окна.
+        :param sfreq: Частота дискретизации.
+        :param start: Отсчёт начала сна (как у wake_coords).
+        :param end: Отсчёт конца сна или None, если он ещё не известен.
+        """
+        self.big_window = big_window
+        self.small_window = small_window
+        self.num_parts = num_parts
+        self.window_big = int(sfreq * big_window)
+        self.window_small = int(sfreq * small_window)
+        self.step = self.window_small // 2
+        self.end = end
+
+        # Сколько отсчётов нужно до и после центра окна
+        self._behind = max(self.window_big // 2, self.window_small // 2)
+        self._ahead = max(
+            self.window_big // 2,
+            self.window_small // 2,
+            small_window - self.window_big // 2 + 2 * (self.window_big // 2),
+        )
+
+        self._airflow = np.empty(0)
+        self._sat = np.empty(0)
+        self._offset = 0
+        self._next = start + self.window_big // 2
+        self._run = {"apnoe": None, "hypapnoe": None}
+
+    @property
+    def n_samples(self):
+        """
+        Количество принятых отсчётов (при известном end - не больше нужных
+        последнему окну).
+        """
+        return self._offset + len(self._airflow)
+
+    def push(self, airflow, sat):
+        """
+        Добавляет порцию сигналов и размечает окна, для которых уже хватает данных.
+
+        :param airflow: Массив значений Airflow.
+        :param sat: Массив значений SaO2 той же длины.
+        :return: Словарь с эпизодами апноэ и гипопноэ, закрытыми этой порцией.
+        """
+        airflow = np.asarray(airflow, dtype=np.float64)
+        sat = np.asarray(sat, dtype=np.float64)
+        if airflow.shape != sat.shape or airflow.ndim != 1:
+            raise ValueError("Airflow and SaO2 chunks must be 1-D arrays of equal length.")
+        if self.end is not None:
+            # Последнее окно (центр до end - window_big // 2) не читает дальше этого отсчёта
+            room = max(self.end - self.window_big // 2 - 1 + self._ahead - self.n_samples, 0)
+            airflow, sat = airflow[:room], sat[:room]
+
+        self._airflow = np.concatenate([self._airflow, airflow])
+        self._sat = np.concatenate([self._sat, sat])
+        return self._process(self.n_samples - self._ahead + 1)
+
+    def finish(self):
+        """
+        Размечает оставшиеся окна по доступным данным (окна у конца записи
+        обрезаются, как при срезе). Незакрытый эпизод в конце отбрасывается,
+        как в mark_episodes.
+
+        :return: Словарь с эпизодами апноэ и гипопноэ, закрытыми в конце записи.
+        """
+        end = self.n_samples if self.end is None else min(self.end, self.n_samples)
+        episode_s_e = self._process(end - self.window_big // 2)
+        self._run = {"apnoe": None, "hypapnoe": None}
+        return episode_s_e
+
+    def _process(self, limit):
+        """
+        Размечает окна с центрами от self._next до limit (не включая) и
+        отбрасывает историю, которая больше не понадобится.
+        """
+        if self.end is not None:
+            limit = min(limit, self.end - self.window_big // 2)
+        episode_s_e = {"apnoe": [], "hypapnoe": []}
+        if limit > self._next:
+            positions = np.arange(self._next, limit, self.step)
+            is_apnoe, is_hypapnoe = _classify_windows(
+                self._airflow,
+                self._sat,
+                positions - self._offset,
+                self.window_big,
+                self.window_small,
+                self.small_window,
+                self.num_parts,
+            )
+            self._close(positions, is_apnoe, is_hypapnoe, episode_s_e)
+            self._next = int(positions[-1]) + self.step
+
+        drop = min(self._next - self._behind - self._offset, len(self._airflow))
+        if drop > 0:
+            self._airflow = self._airflow[drop:].copy()
+            self._sat = self._sat[drop:].copy()
+            self._offset += drop
+        return episode_s_e
+
+    def _close(self, positions, is_apnoe, is_hypapnoe, episode_s_e):
+        """
+        Продолжает текущую серию отмеченных окон и закрывает её первым
+        неотмеченным окном (правила EpisodeTable.from_windows).
+        """
+        half = self.window_small // 2
+        for position, apnoe, hypapnoe in zip(
+            positions.tolist(), is_apnoe.tolist(), is_hypapnoe.tolist()
+        ):
+            if apnoe or hypapnoe:
+                kind = "apnoe" if apnoe else "hypapnoe"
+                run = self._run[kind]
+                self._run[kind] = (position if run is None else run[0], position)
+                continue
+            kind = "apnoe" if self._run["apnoe"] is not None else "hypapnoe"
+            run = self._run[kind]
+            if run is not None:
+                episode_s_e[kind].append((run[0] - half, run[1] + half - 1))
+            self._run = {"apnoe": None, "hypapnoe": None}
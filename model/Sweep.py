@@ -0,0 +1,148 @@
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .Analyser import _SlidingExtrema, _classify_windows
+from .Episodes import EpisodeTable
+from .Hypnogram import sleep_bounds
+
+# Общие данные перебора в процессе: скользящие экстремумы, границы сна, эталон
+_shared = None
+
+
+def sweep_episodes(
+    airflow,
+    sat,
+    hyp,
+    big_windows=(60,),
+    small_windows=(4,),
+    num_parts=(8,),
+    reference=None,
+    sfreq=200,
+    n_workers=1,
+):
+    """
+    Перебор параметров mark_episodes по сетке.
+
+    Скользящие максимумы и минимумы Airflow и SaO2 считаются один раз для
+    всех встречающихся в сетке ширин окон (уровни разреженной таблицы,
+    _SlidingExtrema); каждая комбинация параметров берёт экстремумы своих
+    окон из этих общих массивов и даёт те же эпизоды, что mark_episodes с
+    этими параметрами. Комбинации
+    распределяются по процессам, общие массивы передаются процессам один
+    раз при запуске.
+
+    :param airflow: Массив значений Airflow.
+    :param sat: Массив значений SaO2.
+    :param hyp: Гипнограмма по отсчётам сигналов.
+    :param big_windows: Значения размера большого окна, секунды.
+    :param small_windows: Значения размера маленького окна, секунды.
+    :param num_parts: Значения количества кусочков большого окна.
+    :param reference: Эталонная разметка (EpisodeTable или словарь как у
+        mark_episodes) для метрик согласия; None - только количества.
+    :param sfreq: Частота дискретизации.
+    :param n_workers: Количество процессов (1 - без пула, None - по числу ядер).
+    :return: DataFrame: строка на комбинацию с количествами эпизодов и метриками.
+    """
+    grid = [
+        (big, small, parts)
+        for big, small, parts in itertools.product(big_windows, small_windows, num_parts)
+        if (int(sfreq * big) - int(sfreq * small)) // parts > 0
+    ]
+    if reference is not None and not isinstance(reference, EpisodeTable):
+        reference = EpisodeTable.from_dict(reference, sfreq)
+
+    airflow_extrema = _SlidingExtrema(airflow)
+    sat_extrema = _SlidingExtrema(sat)
+    airflow_widths, sat_widths = set(), set()
+    for big, small, parts in grid:
+        window_big, window_small = int(sfreq * big), int(sfreq * small)
+        airflow_widths.update({2 * (window_small // 2), (window_big - window_small) // parts})
+        sat_widths.add(2 * (window_big // 2))
+    if grid:
+        airflow_extrema.precompute(*airflow_widths)
+        sat_extrema.precompute(*sat_widths)
+
+    shared = (airflow_extrema, sat_extrema, sleep_bounds(hyp), reference, sfreq)
+    if n_workers == 1:
+        _init_sweep(shared)
+        rows = [_evaluate(params) for params in grid]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=n_workers, initializer=_init_sweep, initargs=(shared,)
+        ) as executor:
+            rows = list(executor.map(_evaluate, grid, chunksize=max(len(grid) // 32, 1)))
+    return pd.DataFrame(rows)
+
+
+def agreement(table: EpisodeTable, reference: EpisodeTable) -> dict:
+    """
+    Согласие разметки с эталоном по эпизодам.
+
+    Эпизод считается найденным, если он пересекается хотя бы с одним
+    эпизодом другой разметки (эпизоды каждой разметки не пересекаются
+    между собой).
+
+    :param table: Проверяемая разметка.
+    :param reference: Эталонная разметка.
+    :return: Словарь с точностью, полнотой, F1 и долей совпавших типов.
+    """
+    found, same_kind = _matches(table, reference)
+    recalled, _ = _matches(reference, table)
+    precision = found.mean() if len(found) else 0.0
+    recall = recalled.mean() if len(recalled) else 0.0
+    return {
+        "precision": float(precision),
+        "recall": float(recall),
+        "f1": float(2 * precision * recall / (precision + recall)) if precision + recall else 0.0,
+        "kind_agreement": float(same_kind[found].mean()) if found.any() else 0.0,
+    }
+
+
+def _matches(table, other):
+    """
+    Для каждого эпизода table: пересекается ли он с эпизодом other и
+    совпадает ли тип с первым пересекающимся эпизодом.
+    """
+    if not len(other):
+        return np.zeros(len(table), dtype=bool), np.zeros(len(table), dtype=bool)
+    j = np.searchsorted(other.end, table.start, side="left")
+    inside = j < len(other)
+    j = np.minimum(j, len(other) - 1)
+    found = inside & (other.start[j] <= table.end)
+    return found, other.kind[j] == table.kind
+
+
+def _init_sweep(shared):
+    global _shared
+    _shared = shared
+
+
+def _evaluate(params):
+    """
+    Разметка и метрики для одной комбинации параметров.
+    """
+    airflow, sat, (start, end), reference, sfreq = _shared
+    big_window, small_window, num_parts = params
+    window_big, window_small = int(sfreq * big_window), int(sfreq * small_window)
+
+    positions = np.arange(start + window_big // 2, end - window_big // 2, window_small // 2)
+    is_apnoe, is_hypapnoe = _classify_windows(
+        airflow, sat, positions, window_big, window_small, small_window, num_parts
+    )
+    table = EpisodeTable.from_windows(positions, is_apnoe, is_hypapnoe, window_small // 2, sfreq)
+
+    row = {
+        "big_window": big_window,
+        "small_window": small_window,
+        "num_parts": num_parts,
+        "n_apnoe": int(np.count_nonzero(table.kind == 0)),
+        "n_hypapnoe": int(np.count_nonzero(table.kind == 1)),
+        "n_episodes": len(table),
+    }
+    if reference is not None:
+        row["n_reference"] = len(reference)
+        row.update(agreement(table, reference))
+    return row
@@ -0,0 +1,148 @@
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Timings:
+    # Этапы обработки в порядке отчёта
+    stages = ("load", "filtering", "features", "detection", "prediction", "rendering")
+
+    def __init__(self):
+        """
+        Замеры времени этапов обработки одного исследования.
+
+        Каждый замер - именованный интервал (этап, начало, длительность);
+        вложенные интервалы одного этапа не учитываются повторно. Замеры
+        частей этапа (details) в суммы по этапам не входят.
+        """
+        self.spans = []
+        self.details = []
+        self._lock = threading.Lock()
+        self._active = threading.local()
+
+    @contextmanager
+    def span(self, name: str):
+        """
+        Замеряет время выполнения блока.
+
+        Parameters:
+        name (str): Название этапа.
+        """
+        active = getattr(self._active, "names", None)
+        if active is None:
+            active = self._active.names = []
+        if name in active:
+            yield
+            return
+        active.append(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            active.remove(name)
+            self.add(name, time.perf_counter() - start, start)
+
+    def add(self, name: str, seconds: float, start: float = None):
+        """
+        Добавляет замер, сделанный вне span.
+
+        Parameters:
+        name (str): Название этапа.
+        seconds (float): Длительность, секунды.
+        start (float): Начало по time.perf_counter.
+        """
+        with self._lock:
+            self.spans.append((name, start, seconds))
+
+    def detail(self, name: str, seconds: float):
+        """
+        Добавляет замер части этапа (например, экспорта одного графика),
+        не учитываемый в суммах по этапам.
+
+        Parameters:
+        name (str): Название части этапа.
+        seconds (float): Длительность, секунды.
+        """
+        with self._lock:
+            self.details.append((name, seconds))
+
+    def clear(self):
+        with self._lock:
+            self.spans = []
+            self.details = []
+
+    def totals(self) -> dict:
+        """
+        Суммарное время по этапам.
+
+        Returns:
+        dict: Этап -> секунды; известные этапы идут в порядке Timings.stages.
+        """
+        result = {}
+        with self._lock:
+            for name, _, seconds in self.spans:
+                result[name] = result.get(name, 0.0) + seconds
+        order = {name: i for i, name in enumerate(self.stages)}
+        return dict(sorted(result.items(), key=lambda item: order.get(item[0], len(order))))
+
+    @property
+    def total(self) -> float:
+        return sum(self.totals().values())
+
+    def to_dict(self) -> dict:
+        """
+        Замеры в виде, пригодном для JSON.
+
+        Returns:
+        dict: Суммы по этапам, общее время, список интервалов и замеры частей этапов.
+        """
+        with self._lock:
+            spans = [
+                {"stage": name, "seconds": seconds} for name, _, seconds in self.spans
+            ]
+            details = [{"name": name, "seconds": seconds} for name, seconds in self.details]
+        totals = self.totals()
+        return {"stages": totals, "total": sum(totals.values()), "spans": spans, "details": details}
+
+    @staticmethod
+    def aggregate(records) -> dict:
+        """
+        Сводка замеров нескольких исследований.
+
+        Parameters:
+        records (list): Объекты Timings или словари из Timings.to_dict.
+
+        Returns:
+        dict: Этап -> {"count", "total", "mean", "max"} в секундах.
+        """
+        result = {}
+        for record in records:
+            totals = record.totals() if isinstance(record, Timings) else record["stages"]
+            for name, seconds in totals.items():
+                stats = result.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0})
+                stats["count"] += 1
+                stats["total"] += seconds
+                stats["max"] = max(stats["max"], seconds)
+        for stats in result.values():
+            stats["mean"] = stats["total"] / stats["count"]
+        return result
+
+
+def timed(name: str):
+    """
+    Декоратор метода: замеряет вызов как этап name в self.timings.
+
+    Parameters:
+    name (str): Название этапа.
+    """
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.timings.span(name):
+                return method(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
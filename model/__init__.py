@@ -1,3 +1,14 @@
 from .Analyser import Analyser
 from .DataProcessor import DataProcessor
+from .EdfFile import EdfFile
+from .Episodes import EpisodeIndex, EpisodeTable
+from .Filtering import ChunkedFilter
+from .Hypnogram import Hypnogram
+from .ModelRegistry import ModelRegistry
+from .Recording import Recording
+from .RecordStore import Record, RecordStore
+from .SignalCache import SignalCache
+from .SignalPyramid import SignalPyramid
+from .StreamingDetector import StreamingDetector
+from .Timings import Timings
 
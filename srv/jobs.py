@@ -0,0 +1,171 @@
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from model import Analyser, EpisodeIndex, Hypnogram, Timings
+from front.report import render_report
+from .upload import extract_archive
+
+
+# Этапы анализа исследования в порядке выполнения
+ANALYSIS_STAGES = ["load", "features", "detection", "report"]
+# Этапы обработки загруженного архива: распаковка и анализ
+UPLOAD_STAGES = ["extract"] + ANALYSIS_STAGES
+# Каналы для построения признаков и целевая переменная
+FEATURE_COLUMNS = ["Airflow", "Chest", "Abdomen"]
+TARGET_COLUMN = "SaO2"
+
+
+class Job:
+	def __init__(self, job_id, stages):
+		self.id = job_id
+		self.status = "queued"
+		self.stages = {stage: 0.0 for stage in stages}
+		self.result = None
+		self.error = None
+		self.created = time.time()
+		self.finished = None
+		self._lock = threading.Lock()
+
+	def set_progress(self, stage, fraction):
+		with self._lock:
+			self.stages[stage] = fraction
+
+	def to_dict(self):
+		with self._lock:
+			return {
+				"id": self.id,
+				"status": self.status,
+				"stages": dict(self.stages),
+				"error": self.error,
+				"created": self.created,
+				"finished": self.finished,
+			}
+
+
+class JobQueue:
+	def __init__(self, max_workers=2):
+		"""
+		Очередь фоновых задач анализа, выполняемых пулом потоков.
+
+		:param max_workers: Количество одновременно выполняемых задач.
+		"""
+		self._executor = ThreadPoolExecutor(max_workers=max_workers)
+		self._jobs = {}
+		self._lock = threading.Lock()
+
+	def submit(self, func, *args, stages=ANALYSIS_STAGES):
+		"""
+		Ставит задачу в очередь.
+
+		:param func: Функция задачи, принимает аргументы и функцию progress(stage, fraction).
+		:param args: Аргументы функции.
+		:param stages: Названия этапов задачи.
+		:return: Идентификатор задачи.
+		"""
+		job = Job(uuid.uuid4().hex, stages)
+		with self._lock:
+			self._jobs[job.id] = job
+		self._executor.submit(self._run, job, func, args)
+		return job.id
+
+	def get(self, job_id):
+		with self._lock:
+			return self._jobs.get(job_id)
+
+	def _run(self, job, func, args):
+		job.status = "running"
+		try:
+			job.result = func(*args, progress=job.set_progress)
+			job.status = "done"
+		except Exception:
+			job.error = traceback.format_exc()
+			job.status = "failed"
+		job.finished = time.time()
+
+
+def analyse_study(study_path, model_path, progress):
+	"""
+	Анализ всех записей загруженного исследования: загрузка, признаки,
+	разметка эпизодов и отчёт.
+
+	:param study_path: Путь к распакованному исследованию.
+	:param model_path: Путь к предобученной модели.
+	:param progress: Функция progress(stage, fraction) для отчёта о ходе работы.
+	:return: Словарь с эпизодами, путями к отчётам и пирамиде просмотрщика,
+		замерами времени по каждой записи и сводкой замеров по исследованию.
+	"""
+	analyser = Analyser(study_path, model_path)
+	records = analyser.dp.find_record_dirs()
+	result = {"records": []}
+	for n, (patient_id, record_id) in enumerate(records, 1):
+		analyser.timings.clear()
+		pyramid_dir = os.path.join(study_path, f"pyramid_Np{patient_id}_Nr{record_id}")
+		analyser.get_record(patient_id, record_id, pyramid_dir=pyramid_dir)
+		progress("load", n / len(records))
+
+		analyser.prep_X_y(FEATURE_COLUMNS, TARGET_COLUMN)
+		progress("features", n / len(records))
+
+		# Гипнограмма записана со своей частотой, разметке нужны стадии по отсчётам полиграммы
+		hypnogram = Hypnogram.from_samples(analyser.hypno["stage"], analyser.hypno.sfreq)
+		table = analyser.mark_episodes(
+			analyser.df_poly,
+			hypnogram.to_samples(analyser.poly.sfreq, analyser.poly.n_samples),
+			as_table=True,
+		)
+		index = EpisodeIndex(table, analyser.hypno["stage"], analyser.hypno.sfreq)
+		episodes = table.to_df()
+		progress("detection", n / len(records))
+
+		duration = int(analyser.poly.duration)
+		reports = render_report(episodes, duration, timings=analyser.timings)
+		report_paths = {}
+		for fmt, content in reports.items():
+			report_paths[fmt] = os.path.join(
+				study_path, f"report_Np{patient_id}_Nr{record_id}.{fmt}"
+			)
+			with open(report_paths[fmt], "wb") as f:
+				f.write(content)
+		progress("report", n / len(records))
+
+		result["records"].append(
+			{
+				"patient": patient_id,
+				"record": record_id,
+				"episodes": episodes.to_dict("records"),
+				"stage_counts": index.stage_counts(),
+				"summary": hypnogram.summary(table),
+				"reports": report_paths,
+				"pyramid": pyramid_dir,
+				"timings": analyser.timings.to_dict(),
+			}
+		)
+	result["timings"] = Timings.aggregate(
+		[record["timings"] for record in result["records"]]
+	)
+	for stage in ANALYSIS_STAGES:
+		progress(stage, 1.0)
+	return result
+
+
+def process_upload(zip_path, study_path, model_path, max_extract_bytes, upload, progress):
+	"""
+	Распаковка загруженного архива и анализ исследования.
+
+	:param zip_path: Путь к загруженному архиву (удаляется после распаковки).
+	:param study_path: Директория для распаковки исследования.
+	:param model_path: Путь к предобученной модели.
+	:param max_extract_bytes: Максимальный размер распакованных данных.
+	:param upload: Сведения о загрузке (имя архива, размер и скорость приёма).
+	:param progress: Функция progress(stage, fraction) для отчёта о ходе работы.
+	:return: Результат analyse_study и статистика загрузки и распаковки (upload).
+	"""
+	stats = extract_archive(zip_path, study_path, max_extract_bytes)
+	progress("extract", 1.0)
+	result = analyse_study(study_path, model_path, progress)
+	result["upload"] = dict(upload, **stats)
+	return result
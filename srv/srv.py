@@ -1,29 +1,82 @@
-from flask import redirect, Flask, request
+from flask import redirect, Flask, request, abort, jsonify
+from werkzeug.utils import secure_filename
 from model import Analyser, DataProcessor 
+from .upload import UnsafeArchive, UploadRequest, UploadTooLarge, check_zip, remove_uploads, upload_stats
+from .jobs import UPLOAD_STAGES, JobQueue, process_upload
 import shutil
 import os
+import uuid
 
 
 app = Flask(__name__)
+app.request_class = UploadRequest
 
 TGT_FILEPATH = "/projects_core/sleeps/"
 CUR_STUDY = None
+CUR_JOB = None
+MODEL_PATH = "model/pretrained_model/model"
+ANALYSIS_WORKERS = 2
+MAX_UPLOAD_BYTES = 8 * 1024 ** 3
+MAX_EXTRACT_BYTES = 32 * 1024 ** 3
+
+app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_BYTES
+app.config["UPLOAD_DIR"] = TGT_FILEPATH
+
+JOBS = JobQueue(max_workers=ANALYSIS_WORKERS)
 
 @app.route("/upload", methods=["POST", "GET"])
 def upload():
 	if request.method == "POST":
 		file = request.files["file_inpute"]
-		file.save(TGT_FILEPATH + file.filename)
-		# shutil.copy(filepath, TGT_FILEPATH)
-		os.system(f'unzip {TGT_FILEPATH + file.filename} -d {TGT_FILEPATH + file.filename.split(".zip")[0]}')
-		os.system(f"rm {TGT_FILEPATH + file.filename}")
-		global CUR_STUDY
-		CUR_STUDY = TGT_FILEPATH + file.filename.split(".zip")[0]
-		return redirect("https://sleep.projectswhynot.site/time_page.html", code=302)
+		# Имя архива сохраняется только в результате; исследование
+		# распаковывается в отдельную директорию каждой загрузки
+		name = os.path.splitext(secure_filename(file.filename or ""))[0]
+		# Архив уже записан парсером формы в TGT_FILEPATH (UploadRequest)
+		zip_path = file.stream.name
+		file.stream.close()
+		study_path = os.path.join(TGT_FILEPATH, uuid.uuid4().hex)
+		try:
+			check_zip(zip_path, study_path, MAX_EXTRACT_BYTES)
+		except (UnsafeArchive, UploadTooLarge) as e:
+			abort(413 if isinstance(e, UploadTooLarge) else 400)
+		stats = dict(upload_stats(request, zip_path), name=name)
+		app.logger.info(
+			f"{name}: uploaded {stats['uploaded_bytes']} bytes "
+			f"at {stats['upload_bytes_per_sec'] / 1024 ** 2:.1f} MB/s"
+		)
+		global CUR_STUDY, CUR_JOB
+		CUR_STUDY = study_path
+		CUR_JOB = JOBS.submit(
+			process_upload, zip_path, study_path, MODEL_PATH, MAX_EXTRACT_BYTES, stats, stages=UPLOAD_STAGES
+		)
+		# Архив передан задаче, которая удалит его после распаковки
+		request.upload_paths.remove(zip_path)
+		return redirect(f"https://sleep.projectswhynot.site/time_page.html?job={CUR_JOB}", code=302)
 	else:
-		# global CUR_STUDY
-		# TODO: run processing and prediction
-		analyser = Analyser(CUR_STUDY, "model/pretrained_model/model")
+		return redirect(f"https://sleep.projectswhynot.site/results?job={CUR_JOB}", code=302)
+
+
+@app.teardown_request
+def cleanup_upload(exc=None):
+	remove_uploads(request)
+
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+	job = JOBS.get(job_id)
+	if job is None:
+		abort(404)
+	return jsonify(job.to_dict())
+
 
-		return redirect("https://sleep.projectswhynot.site/results", code=302)
+@app.route("/jobs/<job_id>/result", methods=["GET"])
+def job_result(job_id):
+	job = JOBS.get(job_id)
+	if job is None:
+		abort(404)
+	if job.status == "failed":
+		return jsonify(job.to_dict()), 500
+	if job.status != "done":
+		return jsonify(job.to_dict()), 202
+	return jsonify(job.result)
 
@@ -0,0 +1,165 @@
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+
+from flask import Request, current_app
+
+
+# Размер блока при распаковке архива
+CHUNK_SIZE = 1 << 20
+
+
+class UploadTooLarge(ValueError):
+	pass
+
+
+class UnsafeArchive(ValueError):
+	pass
+
+
+class UploadRequest(Request):
+	def _load_form_data(self):
+		"""
+		Замеряет разбор формы: приём тела запроса и запись файлов на диск
+		(upload_seconds).
+		"""
+		loaded = "form" in self.__dict__
+		start = time.perf_counter()
+		super()._load_form_data()
+		if not loaded:
+			self.upload_seconds = time.perf_counter() - start
+
+	def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+		"""
+		Файлы формы пишутся парсером запроса блоками сразу в директорию
+		загрузок (app.config["UPLOAD_DIR"]), без промежуточного временного
+		файла и без чтения всего тела запроса в память. Размер тела
+		ограничивается app.config["MAX_CONTENT_LENGTH"] ещё при чтении потока.
+		"""
+		upload_dir = current_app.config["UPLOAD_DIR"]
+		os.makedirs(upload_dir, exist_ok=True)
+		f = tempfile.NamedTemporaryFile("wb+", dir=upload_dir, suffix=".zip", delete=False)
+		self.upload_paths.append(f.name)
+		return f
+
+	@property
+	def upload_paths(self):
+		"""
+		Файлы, записанные при разборе запроса; файлы, оставшиеся в списке
+		после обработки запроса, удаляются (remove_uploads).
+		"""
+		if "_upload_paths" not in self.__dict__:
+			self._upload_paths = []
+		return self._upload_paths
+
+
+def upload_stats(request, path):
+	"""
+	Размер принятого файла и скорость приёма.
+
+	:param request: Запрос UploadRequest с разобранной формой.
+	:param path: Путь к записанному файлу.
+	:return: Словарь со статистикой: размер в байтах и скорость в байтах в секунду.
+	"""
+	uploaded = os.path.getsize(path)
+	return {
+		"uploaded_bytes": uploaded,
+		"upload_bytes_per_sec": uploaded / max(getattr(request, "upload_seconds", 0.0), 1e-9),
+	}
+
+
+def remove_uploads(request):
+	"""
+	Удаляет файлы запроса, не переданные дальше (например, при ошибке
+	разбора или отклонённом архиве).
+	"""
+	for path in getattr(request, "upload_paths", []):
+		if os.path.exists(path):
+			os.remove(path)
+
+
+def check_zip(zip_path, dest, max_bytes):
+	"""
+	Проверяет архив по его оглавлению, не распаковывая: все пути должны
+	оставаться внутри dest, а суммарный размер файлов - не больше max_bytes.
+
+	:param zip_path: Путь к архиву.
+	:param dest: Директория назначения.
+	:param max_bytes: Максимальный суммарный размер распакованных файлов.
+	:return: Количество файлов в архиве.
+	"""
+	root = os.path.realpath(dest)
+	try:
+		with zipfile.ZipFile(zip_path) as zf:
+			members = zf.infolist()
+	except zipfile.BadZipFile as e:
+		raise UnsafeArchive(f"Not a zip archive: {e}")
+	if sum(member.file_size for member in members) > max_bytes:
+		raise UploadTooLarge(f"Archive content exceeds {max_bytes} bytes.")
+	for member in members:
+		target = os.path.realpath(os.path.join(root, member.filename))
+		if os.path.commonpath([root, target]) != root:
+			raise UnsafeArchive(f"Unsafe path in archive: {member.filename}")
+	return len(members)
+
+
+def extract_zip(zip_path, dest, max_bytes, chunk_size=CHUNK_SIZE):
+	"""
+	Распаковывает архив средствами стандартной библиотеки, записывая каждый
+	файл напрямую в директорию назначения блоками фиксированного размера.
+	При ошибке созданная директория назначения удаляется.
+
+	:param zip_path: Путь к архиву.
+	:param dest: Директория назначения.
+	:param max_bytes: Максимальный суммарный размер распакованных файлов.
+	:param chunk_size: Размер блока.
+	:return: Количество распакованных байт.
+	"""
+	check_zip(zip_path, dest, max_bytes)
+	root = os.path.realpath(dest)
+	created = not os.path.exists(root)
+	written = 0
+	try:
+		with zipfile.ZipFile(zip_path) as zf:
+			for member in zf.infolist():
+				target = os.path.realpath(os.path.join(root, member.filename))
+				if member.is_dir():
+					os.makedirs(target, exist_ok=True)
+					continue
+				os.makedirs(os.path.dirname(target), exist_ok=True)
+				with zf.open(member) as src, open(target, "wb") as dst:
+					while True:
+						chunk = src.read(chunk_size)
+						if not chunk:
+							break
+						written += len(chunk)
+						if written > max_bytes:
+							raise UploadTooLarge(f"Archive content exceeds {max_bytes} bytes.")
+						dst.write(chunk)
+	except BaseException:
+		if created:
+			shutil.rmtree(root, ignore_errors=True)
+		raise
+	return written
+
+
+def extract_archive(zip_path, dest, max_bytes):
+	"""
+	Распаковывает загруженный архив и удаляет его.
+
+	:param zip_path: Путь к архиву.
+	:param dest: Директория для распаковки.
+	:param max_bytes: Максимальный размер распакованных данных.
+	:return: Словарь со статистикой: размер в байтах и скорость в байтах в секунду.
+	"""
+	start = time.perf_counter()
+	try:
+		extracted = extract_zip(zip_path, dest, max_bytes)
+	finally:
+		os.remove(zip_path)
+	return {
+		"extracted_bytes": extracted,
+		"extract_bytes_per_sec": extracted / max(time.perf_counter() - start, 1e-9),
+	}
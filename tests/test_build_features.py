@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from model import Analyser
+
+COLUMNS = ["Airflow", "Chest", "Abdomen"]
+WINDOW = 200
+
+
+@pytest.fixture(scope="module")
+def record():
+    rng = np.random.default_rng(0)
+    data = rng.normal(size=(WINDOW * 120, len(COLUMNS) + 1)) + 95
+    return pd.DataFrame(data, columns=COLUMNS + ["SaO2"])
+
+
+def shifted_frame(df, shifts):
+    """
+    Признаки через DataFrame.shift, как до build_features; остаются только
+    строки без пропусков от сдвигов.
+    """
+    feat = df[COLUMNS][WINDOW::WINDOW].reset_index(drop=True)
+    rolling = df[COLUMNS].rolling(WINDOW)
+    mean = rolling.mean()[WINDOW::WINDOW].reset_index(drop=True)
+    median = rolling.median()[WINDOW::WINDOW].reset_index(drop=True)
+    feat = pd.concat([feat, mean.add_suffix("_mean"), median.add_suffix("_median")], axis=1)
+    block_columns = list(feat.columns)
+    for sh in shifts:
+        for col in block_columns:
+            feat[col + f"_shifted{sh}"] = feat[col].shift(sh)
+    col = COLUMNS[-1]
+    feat["ratio"] = feat[col] / feat[col + "_median"]
+    feat["diff"] = feat[col] - feat[col + "_median"]
+    target = df["SaO2"][WINDOW::WINDOW].reset_index(drop=True)
+    keep = feat.notna().all(axis=1).to_numpy()
+    return feat[keep], target[keep]
+
+
+@pytest.mark.parametrize(
+    "shifts",
+    [[-30, -15, -5, 5, 15, 30], [-1, -2], [3, 7], [-4, 10], []],
+    ids=["default", "negative", "positive", "asymmetric", "none"],
+)
+def test_build_features_matches_shift(tmp_path, record, shifts):
+    analyser = Analyser(str(tmp_path), None)
+    X, y, columns = analyser.build_features(record, COLUMNS, "SaO2", WINDOW, WINDOW, shifts)
+    expected, target = shifted_frame(record, shifts)
+
+    assert columns == list(expected.columns)
+    assert not np.isnan(X).any()
+    np.testing.assert_allclose(X, expected.to_numpy(), rtol=1e-5)
+    np.testing.assert_array_equal(y[:, 0], target.to_numpy())
@@ -0,0 +1,14 @@
+import srv.jobs
+from benchmarks.synthetic import generate_record
+
+
+def test_analyse_study_finds_episodes(tmp_path, monkeypatch):
+    generate_record(str(tmp_path), duration=3600.0, events_per_hour=30, seed=1)
+    # Отчёты не проверяются: экспорт графиков требует kaleido
+    monkeypatch.setattr(srv.jobs, "render_report", lambda *args, **kwargs: {})
+
+    result = srv.jobs.analyse_study(str(tmp_path), None, progress=lambda stage, fraction: None)
+
+    (record,) = result["records"]
+    assert len(record["episodes"]) > 0
+    assert sum(record["stage_counts"].values()) == len(record["episodes"])
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import make_events, make_signals
+from model import Analyser, EpisodeTable
+
+SFREQ = 200
+DURATION = 1200.0
+
+
+@pytest.fixture(scope="module")
+def record():
+    rng = np.random.default_rng(0)
+    events = make_events(DURATION, 12, rng)
+    data = make_signals(DURATION, SFREQ, ["Airflow", "SaO2"], events, rng)
+    return pd.DataFrame(data.T, columns=["Airflow", "SaO2"])
+
+
+def make_hyp(n_samples, trailing_wake):
+    """
+    Гипнограмма по отсчётам: бодрствование первые 60 секунд и, если
+    trailing_wake, последние 120 секунд.
+    """
+    hyp = np.full(n_samples, 2)
+    hyp[: 60 * SFREQ] = 0
+    if trailing_wake:
+        hyp[-120 * SFREQ :] = 0
+    return hyp
+
+
+@pytest.mark.parametrize("trailing_wake", [True, False], ids=["trailing_wake", "ends_asleep"])
+def test_vectorized_matches_loop(tmp_path, record, trailing_wake):
+    analyser = Analyser(str(tmp_path), None)
+    hyp = make_hyp(len(record), trailing_wake)
+
+    loop = analyser.mark_episodes(record, hyp, engine="loop")
+    vectorized = analyser.mark_episodes(record, hyp, engine="vectorized")
+    table = analyser.mark_episodes(record, hyp, as_table=True)
+
+    assert loop["apnoe"] or loop["hypapnoe"]
+    assert vectorized == loop
+    assert isinstance(table, EpisodeTable)
+    assert table.to_dict() == loop
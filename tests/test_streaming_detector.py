@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import make_events, make_signals
+from model import Analyser, StreamingDetector
+
+SFREQ = 200
+DURATION = 1200.0
+CHUNK = 1000
+
+
+@pytest.fixture(scope="module")
+def record():
+    rng = np.random.default_rng(0)
+    events = make_events(DURATION, 12, rng)
+    data = make_signals(DURATION, SFREQ, ["Airflow", "SaO2"], events, rng)
+    return pd.DataFrame(data.T, columns=["Airflow", "SaO2"])
+
+
+def stream(detector, record):
+    """
+    Подаёт запись порциями по CHUNK отсчётов; возвращает эпизоды и
+    наибольшую длину хранимой истории.
+    """
+    episode_s_e = {"apnoe": [], "hypapnoe": []}
+    buffered = 0
+    for i in range(0, len(record), CHUNK):
+        part = record.iloc[i : i + CHUNK]
+        for kind, episodes in detector.push(part["Airflow"], part["SaO2"]).items():
+            episode_s_e[kind].extend(episodes)
+        buffered = max(buffered, len(detector._airflow))
+    for kind, episodes in detector.finish().items():
+        episode_s_e[kind].extend(episodes)
+    return episode_s_e, buffered
+
+
+@pytest.mark.parametrize("trailing_wake", [True, False], ids=["trailing_wake", "ends_asleep"])
+def test_streaming_matches_mark_episodes(tmp_path, record, trailing_wake):
+    analyser = Analyser(str(tmp_path), None)
+    hyp = np.full(len(record), 2)
+    hyp[: 60 * SFREQ] = 0
+    if trailing_wake:
+        hyp[-300 * SFREQ :] = 0
+    start, end = analyser.wake_coords(hyp)
+
+    expected = analyser.mark_episodes(record, hyp)
+    detector = StreamingDetector(sfreq=SFREQ, start=start, end=end)
+    episode_s_e, buffered = stream(detector, record)
+
+    assert expected["apnoe"] or expected["hypapnoe"]
+    assert episode_s_e == expected
+    # История ограничена окном и порцией и не растёт с данными после end
+    assert buffered <= detector._behind + detector._ahead + CHUNK